@@ -0,0 +1,124 @@
+import os
+import json
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional, Union
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+# Cache-Control policy per kind of response; override with CACHE_CONTROL_<NAME>
+CACHE_CONTROL_DEFAULTS = {
+    # Comics for a past date are never regenerated
+    "comic_archive": "public, max-age=31536000, immutable",
+    # Today's comic may still be corrected
+    "comic_current": "public, max-age=60",
+    "comic_list": "public, max-age=30",
+    # Stories are never edited after generation
+    "story": "public, max-age=86400",
+    "story_list": "public, max-age=10",
+}
+
+_datetime_adapter = TypeAdapter(datetime)
+
+def cache_control(policy: str) -> str:
+    """Cache-Control header value for a policy name"""
+    return os.environ.get(f"CACHE_CONTROL_{policy.upper()}", CACHE_CONTROL_DEFAULTS[policy])
+
+def compute_etag(payload: Any) -> str:
+    """Strong ETag derived from the JSON content of a payload
+    
+    A model is hashed in exactly the serialization model_response sends, so
+    equal tags always mean byte-identical bodies. Other payloads only count
+    fields that were set.
+    """
+    if isinstance(payload, BaseModel):
+        # Serialized by pydantic-core, an order of magnitude faster than jsonable_encoder
+        body = payload.model_dump_json().encode()
+    else:
+        body = json.dumps(jsonable_encoder(payload, exclude_unset=True), sort_keys=True, separators=(",", ":"), default=str).encode()
+    return body_etag(body)
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag of an already rendered response body"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+class RenderedModel:
+    """A validated model rendered once as its JSON response body, with the body's ETag
+
+    Meant for cache entries: hits and 304s reuse the body and tag instead of
+    validating and serializing the model again.
+    """
+
+    def __init__(self, model: BaseModel):
+        self.model = model
+        self.body = model.model_dump_json().encode()
+        self.etag = body_etag(self.body)
+
+    def response(self) -> Response:
+        return Response(content=self.body, media_type="application/json")
+
+def model_response(model: BaseModel) -> Response:
+    """JSON response rendered straight from an already validated model"""
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+def http_date(value: Union[str, datetime]) -> Optional[str]:
+    """Format a timestamp as an HTTP date, or None if it cannot be parsed"""
+    try:
+        moment = _datetime_adapter.validate_python(value)
+    except ValidationError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return format_datetime(moment.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison function
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+def _not_modified_since(header: str, last_modified: str) -> bool:
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+
+def conditional(
+    request: Request,
+    response: Response,
+    payload: Any,
+    policy: str,
+    last_modified: Optional[Union[str, datetime]] = None,
+    etag: Optional[str] = None
+) -> Any:
+    """Attach validators and Cache-Control, answering 304 when the client is current
+
+    Returns a bodiless 304 response, or the payload ready to send. A payload
+    that is a pydantic model is rendered here by pydantic-core, so FastAPI
+    does not validate and encode it again against the route's
+    response_model. Other payloads are returned for normal serialization.
+    The payload may itself be a pre-rendered Response (see RenderedModel),
+    in which case pass its precomputed etag.
+    """
+    headers = {"ETag": etag or compute_etag(payload), "Cache-Control": cache_control(policy)}
+    modified = http_date(last_modified) if last_modified is not None else None
+    if modified:
+        headers["Last-Modified"] = modified
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, headers["ETag"])
+    else:
+        fresh = bool(modified and if_modified_since and _not_modified_since(if_modified_since, modified))
+
+    if fresh:
+        return Response(status_code=304, headers=headers)
+
+    if isinstance(payload, BaseModel):
+        payload = model_response(payload)
+    (payload if isinstance(payload, Response) else response).headers.update(headers)
+    return payload
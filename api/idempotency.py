@@ -0,0 +1,219 @@
+import os
+import json
+import math
+import uuid
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+from fastapi import HTTPException, Request, Response
+from pydantic import BaseModel
+from supabase import Client
+from db.executor import run_query
+from api.metrics import IDEMPOTENT_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# (status code, body, headers) of a finished request
+RenderedResponse = Tuple[int, bytes, Dict[str, str]]
+
+# (method, path, Idempotency-Key)
+Scope = Tuple[str, str, str]
+
+# Headers of the original response that are sent again on a replay
+_REPLAYED_HEADERS = ("location",)
+
+class IdempotencyStore:
+    """Outcome of expensive POST requests by their Idempotency-Key header
+
+    Keys live in the idempotency_keys table, so every server worker sees
+    them. The first request with a key claims it under (method, path, key)
+    and starts the work as a task of its own; its rendered response is
+    stored in the row once the work succeeds. A retry gets that response
+    again, marked with Idempotent-Replayed: true. A retry while the work is
+    running joins the task when it reaches the same worker, and otherwise
+    polls the row until the response is stored. The task is shielded from
+    the callers, so a client that times out and disconnects does not stop
+    the work its retry is going to wait for.
+
+    A key reused with different query parameters is rejected with 422.
+    Failed requests are not stored, so retrying them runs the work again.
+    A running request holds its key for `lease` seconds at most, after
+    which a retry runs the work again; a stored response is replayed for
+    `ttl` seconds. Each worker runs at most `max_in_flight` keyed requests
+    at a time and answers 503 beyond that.
+    """
+
+    def __init__(self, max_in_flight: int = 100, ttl: float = 86400, lease: float = 600, poll_interval: float = 0.5):
+        self.max_in_flight = max_in_flight
+        self.ttl = ttl
+        self.lease = lease
+        self.poll_interval = poll_interval
+        # Keys claimed by this worker whose work is still running
+        self._running: Dict[Scope, Tuple[str, "asyncio.Future[RenderedResponse]"]] = {}
+
+    async def run(
+        self,
+        key: Optional[str],
+        request: Request,
+        model: Type[BaseModel],
+        call: Callable[[], Awaitable[Any]],
+        supabase: Client
+    ) -> Any:
+        """Run `call` once per key and return its response, rendered through `model`
+
+        Without a key the call is simply awaited. `call` may return data for
+        `model` or a ready Response (such as a 202 for a queued job).
+        """
+        if key is None:
+            return await call()
+
+        route = getattr(request.scope.get("route"), "path", request.url.path)
+        scope = (request.method, request.url.path, key)
+        fingerprint = _fingerprint(request)
+
+        result = None
+        while True:
+            entry = self._running.get(scope)
+            if entry is not None:
+                self._check_fingerprint(route, entry[0], fingerprint)
+                task = entry[1]
+                result = result or "joined"
+                break
+
+            if len(self._running) >= self.max_in_flight:
+                IDEMPOTENT_REQUESTS.labels(route, "rejected").inc()
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many generations in progress, retry later",
+                    headers={"Retry-After": "5"}
+                )
+
+            claim_id = str(uuid.uuid4())
+            row = await self._claim(supabase, scope, fingerprint, claim_id)
+            if row is None:
+                # The key was released between the claim and the read; claim again
+                continue
+            self._check_fingerprint(route, row["stored_fingerprint"], fingerprint)
+
+            if row["claimed"]:
+                task = asyncio.ensure_future(self._execute(supabase, scope, claim_id, call, model))
+                task.add_done_callback(lambda done: self._finished(scope, done))
+                self._running[scope] = (fingerprint, task)
+                result = "executed"
+                break
+
+            if row["response_status"] is not None:
+                IDEMPOTENT_REQUESTS.labels(route, "replayed").inc()
+                headers = {**(row["response_headers"] or {}), "Idempotency-Key": key, "Idempotent-Replayed": "true"}
+                return Response(
+                    content=row["response_body"].encode(),
+                    status_code=row["response_status"],
+                    media_type="application/json",
+                    headers=headers
+                )
+
+            # Running on another worker: wait for its response or its lease to end
+            result = "joined"
+            await asyncio.sleep(self.poll_interval)
+        IDEMPOTENT_REQUESTS.labels(route, result).inc()
+
+        status_code, body, headers = await asyncio.shield(task)
+        headers = {**headers, "Idempotency-Key": key}
+        return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+    @staticmethod
+    def _check_fingerprint(route: str, stored: str, fingerprint: str) -> None:
+        if stored != fingerprint:
+            IDEMPOTENT_REQUESTS.labels(route, "conflict").inc()
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with different parameters")
+
+    async def _claim(self, supabase: Client, scope: Scope, fingerprint: str, claim_id: str) -> Optional[Dict[str, Any]]:
+        """Run claim_idempotency_key; None if the key vanished before it could be read"""
+        method, path, key = scope
+        try:
+            response = await run_query(supabase.rpc("claim_idempotency_key", {
+                "request_method": method,
+                "request_path": path,
+                "request_key": key,
+                "request_fingerprint": fingerprint,
+                "request_claim_id": claim_id,
+                "lease_seconds": math.ceil(self.lease)
+            }))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to claim Idempotency-Key: {str(e)}")
+
+        if hasattr(response, 'error') and response.error:
+            raise HTTPException(status_code=500, detail=f"Supabase error: {response.error.message}")
+
+        return response.data[0] if response.data else None
+
+    async def _execute(
+        self,
+        supabase: Client,
+        scope: Scope,
+        claim_id: str,
+        call: Callable[[], Awaitable[Any]],
+        model: Type[BaseModel]
+    ) -> RenderedResponse:
+        """Run the work of a claimed key, then store its response or release the key"""
+        key = scope[2]
+        try:
+            rendered = await _render(call, model)
+        except BaseException:
+            try:
+                await run_query(_for_claim(supabase.table("idempotency_keys").delete(), scope, claim_id))
+            except Exception as e:
+                logger.warning("Failed to release Idempotency-Key %s: %s", key, e)
+            raise
+
+        status_code, body, headers = rendered
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        try:
+            await run_query(_for_claim(supabase.table("idempotency_keys").update({
+                "status_code": status_code,
+                "body": body.decode(),
+                "headers": headers,
+                "expires_at": expires_at.isoformat()
+            }), scope, claim_id))
+        except Exception as e:
+            # Served all the same; retries run again once the lease is over
+            logger.warning("Failed to store the response for Idempotency-Key %s: %s", key, e)
+        return rendered
+
+    def _finished(self, scope: Scope, task: "asyncio.Future[RenderedResponse]") -> None:
+        entry = self._running.get(scope)
+        if entry is not None and entry[1] is task:
+            del self._running[scope]
+        if not task.cancelled():
+            task.exception()  # retrieved, even if every caller went away
+
+async def _render(call: Callable[[], Awaitable[Any]], model: Type[BaseModel]) -> RenderedResponse:
+    payload = await call()
+    if isinstance(payload, Response):
+        headers = {name: value for name, value in payload.headers.items() if name in _REPLAYED_HEADERS}
+        return payload.status_code, payload.body, headers
+    if not isinstance(payload, model):
+        payload = model.model_validate(payload)
+    return 200, payload.model_dump_json().encode(), {}
+
+def _for_claim(query: Any, scope: Scope, claim_id: str) -> Any:
+    """Limit a write to the key's row, as long as it is still held by this claim"""
+    method, path, key = scope
+    return query.eq("method", method).eq("path", path).eq("idempotency_key", key).eq("claim_id", claim_id)
+
+def _fingerprint(request: Request) -> str:
+    """Digest of the request parameters; the generate endpoints take no body"""
+    params = json.dumps(sorted(request.query_params.multi_items()))
+    return hashlib.blake2b(params.encode(), digest_size=16).hexdigest()
+
+@lru_cache()
+def get_idempotency_store() -> IdempotencyStore:
+    """Returns the process-wide IdempotencyStore instance (cached)"""
+    return IdempotencyStore(
+        max_in_flight=int(os.environ.get("IDEMPOTENCY_MAX_IN_FLIGHT", 100)),
+        ttl=float(os.environ.get("IDEMPOTENCY_TTL", 86400)),
+        lease=float(os.environ.get("IDEMPOTENCY_LEASE", 600))
+    )
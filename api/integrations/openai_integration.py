@@ -1,21 +1,97 @@
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
-from typing import List, Tuple, Dict
+import re
+import json
 import time
+import asyncio
+import logging
+import httpx
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+from typing import Any, AsyncIterator, List, Tuple, Dict, Optional
+from db.http_pool import pool_settings, pool_stats
+from db.tracing import record_stage
+from api.metrics import OPENAI_CHAT_DURATION, OPENAI_IMAGE_DURATION, OPENAI_RUN_DURATION, OPENAI_RUN_POLLS
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI client with the correct environment variable name and no additional options
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
+
+# OpenAI client, created per worker process on first use (see get_async_client)
+async_client: Optional[AsyncOpenAI] = None
 
 # Assistant ID for story generation
 STORY_ASSISTANT_ID = "asst_lgs9l7lRtH77ThjUx9BzRSTX"
 
-def generate_story(prompt: str = "Create a short story") -> Tuple[str, List[str]]:
+# Story generation backend: "assistants" (thread + polled run) or "chat"
+# (one Chat Completions request with a JSON schema, assistant as fallback)
+STORY_BACKEND = os.getenv("STORY_BACKEND", "assistants")
+STORY_MODEL = os.getenv("OPENAI_STORY_MODEL", "gpt-4o-mini")
+STORY_STREAM = os.getenv("OPENAI_STORY_STREAM", "false").lower() == "true"
+
+# Output contract of the chat backend: a title and exactly six sentences
+STORY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "sentences": {"type": "array", "items": {"type": "string"}, "minItems": 6, "maxItems": 6}
+    },
+    "required": ["title", "sentences"],
+    "additionalProperties": False
+}
+STORY_SYSTEM_PROMPT = (
+    "You write short stories for a daily comic. Reply with the story's title "
+    "and its sentences, one sentence per array item, without numbering or quotes. "
+    "When asked for seven sentences, the first is the title and the other six go in the array."
+)
+
+# Assistant run polling: start fast, back off while the run is still going
+RUN_POLL_INITIAL_INTERVAL = 0.5
+RUN_POLL_MAX_INTERVAL = 4.0
+RUN_POLL_BACKOFF = 1.5
+RUN_TIMEOUT = float(os.getenv("OPENAI_RUN_TIMEOUT", 120))
+
+# Panel images are rendered concurrently, bounded to respect image rate limits
+PANEL_IMAGE_CONCURRENCY = int(os.getenv("PANEL_IMAGE_CONCURRENCY", 6))
+PANEL_IMAGE_TIMEOUT = float(os.getenv("PANEL_IMAGE_TIMEOUT", 60))
+
+def get_async_client() -> AsyncOpenAI:
+    """Returns this process's OpenAI client, creating it on first use
+    
+    The client owns a connection pool, so it must not be created at import
+    time and inherited by forked server workers.
+    """
+    global async_client
+    if async_client is None:
+        # Pool limits and timeouts come from OPENAI_POOL_* / OPENAI_*_TIMEOUT
+        settings = pool_settings("OPENAI", max_connections=50, timeout=600.0)
+        async_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            timeout=settings["timeout"],
+            http_client=httpx.AsyncClient(**settings)
+        )
+    return async_client
+
+async def close_async_client() -> None:
+    """Close this process's OpenAI client and its connections"""
+    global async_client
+    if async_client is not None:
+        await async_client.close()
+        async_client = None
+
+def openai_pool_stats() -> Dict[str, int]:
+    """Connection pool usage of the OpenAI client, if it has been created"""
+    if async_client is None:
+        return {}
+    return pool_stats(async_client._client)
+
+async def request_story(prompt: str) -> Tuple[str, List[str]]:
     """
-    Generate a story using a specific OpenAI Assistant.
+    Generate a story with the configured backend (STORY_BACKEND).
+    
+    "chat" makes a single Chat Completions request with a JSON schema and
+    falls back to the Assistant if that fails; "assistants" uses the
+    Assistant only. Raises when no story could be generated.
     
     Args:
         prompt: The prompt to guide story generation
@@ -23,73 +99,204 @@ def generate_story(prompt: str = "Create a short story") -> Tuple[str, List[str]
     Returns:
         Tuple containing the title and list of sentences (including title as first sentence)
     """
-    try:
-        # Create a thread
-        thread = client.beta.threads.create()
-
-        # Add a message to the thread
-        message = client.beta.threads.messages.create(
-            thread_id=thread.id,
-            role="user",
-            content=prompt
-        )
+    if STORY_BACKEND == "chat":
+        try:
+            return await generate_story_chat(prompt)
+        except Exception as e:
+            logger.warning("Chat story generation failed, falling back to the assistant: %s", e)
+    return await generate_story_assistant(prompt)
 
-        # Run the assistant
-        run = client.beta.threads.runs.create(
-            thread_id=thread.id,
-            assistant_id=STORY_ASSISTANT_ID
-        )
+async def generate_story_assistant(prompt: str) -> Tuple[str, List[str]]:
+    """Generate a story using a specific OpenAI Assistant (thread, message, polled run)"""
+    client = get_async_client()
+    
+    # Create a thread
+    thread = await client.beta.threads.create()
+
+    # Add a message to the thread
+    message = await client.beta.threads.messages.create(
+        thread_id=thread.id,
+        role="user",
+        content=prompt
+    )
 
-        # Wait for the run to complete
+    # Run the assistant
+    run = await client.beta.threads.runs.create(
+        thread_id=thread.id,
+        assistant_id=STORY_ASSISTANT_ID
+    )
+
+    # Wait for the run to complete without blocking the event loop
+    loop = asyncio.get_running_loop()
+    run_started = loop.time()
+    deadline = run_started + RUN_TIMEOUT
+    interval = RUN_POLL_INITIAL_INTERVAL
+    polls = 0
+    outcome = "error"
+    try:
         while True:
-            run_status = client.beta.threads.runs.retrieve(
+            run_status = await client.beta.threads.runs.retrieve(
                 thread_id=thread.id,
                 run_id=run.id
             )
+            polls += 1
             if run_status.status == 'completed':
+                outcome = "completed"
                 break
             elif run_status.status in ['failed', 'cancelled', 'expired']:
+                outcome = run_status.status
                 raise Exception(f"Assistant run failed with status: {run_status.status}")
-            time.sleep(1)  # Wait for 1 second before checking again
+            if loop.time() + interval > deadline:
+                outcome = "timeout"
+                raise Exception(f"Assistant run did not finish within {RUN_TIMEOUT:.0f} seconds")
+            await asyncio.sleep(interval)
+            interval = min(interval * RUN_POLL_BACKOFF, RUN_POLL_MAX_INTERVAL)
+    finally:
+        OPENAI_RUN_DURATION.labels(outcome).observe(loop.time() - run_started)
+        OPENAI_RUN_POLLS.observe(polls)
+        record_stage("openai run", loop.time() - run_started)
 
-        # Get the assistant's response
-        messages = client.beta.threads.messages.list(thread_id=thread.id)
-        
-        # Get the latest assistant message
-        assistant_message = next((msg for msg in messages if msg.role == "assistant"), None)
-        if not assistant_message:
-            raise Exception("No response from assistant")
+    # Get the assistant's response
+    messages = await client.beta.threads.messages.list(thread_id=thread.id)
+    
+    # Get the latest assistant message
+    assistant_message = next((msg for msg in messages.data if msg.role == "assistant"), None)
+    if not assistant_message:
+        raise Exception("No response from assistant")
 
-        # Extract the story text
-        story_text = assistant_message.content[0].text.value.strip()
-        
-        # Split into sentences
-        sentences = []
-        for line in story_text.split('\n'):
-            line = line.strip()
-            if line:
-                # Split by periods and add each sentence
-                for sentence in line.split('.'):
-                    if sentence.strip():
-                        sentences.append(sentence.strip())
-        
-        # Ensure we have exactly 7 sentences
-        if len(sentences) < 7:
-            raise Exception(f"Assistant generated only {len(sentences)} sentences, expected 7")
-        
-        # First sentence is the title, rest is the story
-        title = sentences[0]
-        return title, sentences[:7]  # Return all 7 sentences (title + 6 story sentences)
+    # Extract the story text
+    story_text = assistant_message.content[0].text.value.strip()
+    
+    # Split into sentences
+    sentences = []
+    for line in story_text.split('\n'):
+        line = line.strip()
+        if line:
+            # Split by periods and add each sentence
+            for sentence in line.split('.'):
+                if sentence.strip():
+                    sentences.append(sentence.strip())
+    
+    # Ensure we have exactly 7 sentences
+    if len(sentences) < 7:
+        raise Exception(f"Assistant generated only {len(sentences)} sentences, expected 7")
+    
+    # First sentence is the title, rest is the story
+    title = sentences[0]
+    return title, sentences[:7]  # Return all 7 sentences (title + 6 story sentences)
+
+async def generate_story_chat(prompt: str, stream: Optional[bool] = None) -> Tuple[str, List[str]]:
+    """Generate a story in one Chat Completions request constrained by STORY_SCHEMA
+    
+    With stream=True (default OPENAI_STORY_STREAM) the completion is read as
+    it is produced, so the read timeout applies between chunks rather than to
+    the whole generation and a stalled completion is noticed sooner.
+    """
+    client = get_async_client()
+    stream = STORY_STREAM if stream is None else stream
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        request = _chat_story_request(prompt)
+        if stream:
+            parts = []
+            async for chunk in await client.chat.completions.create(stream=True, **request):
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+            content = "".join(parts)
+        else:
+            completion = await client.chat.completions.create(**request)
+            content = completion.choices[0].message.content or ""
         
-    except Exception as e:
-        print(f"Error generating story: {e}")
-        return "Error generating story", ["Error"] * 7
+        data = json.loads(content)
+        title = data["title"].strip().rstrip(".")
+        sentences = [sentence.strip().rstrip(".") for sentence in data["sentences"] if sentence.strip()]
+        if len(sentences) != 6:
+            raise Exception(f"Model generated {len(sentences)} story sentences, expected 6")
+        outcome = "completed"
+        return title, [title] + sentences
+    finally:
+        elapsed = time.perf_counter() - started
+        OPENAI_CHAT_DURATION.labels(outcome, "stream" if stream else "single").observe(elapsed)
+        record_stage("openai chat", elapsed)
+
+async def stream_story_chat(prompt: str) -> AsyncIterator[Tuple[str, str]]:
+    """Stream a Chat Completions story as ("title", text) and ("sentence", text)
+    items, each yielded as soon as the model has finished writing it"""
+    client = get_async_client()
+    parser = StoryStreamParser()
+    started = time.perf_counter()
+    outcome = "error"
+    sentences = 0
+    try:
+        async for chunk in await client.chat.completions.create(stream=True, **_chat_story_request(prompt)):
+            if chunk.choices and chunk.choices[0].delta.content:
+                for kind, text in parser.feed(chunk.choices[0].delta.content):
+                    text = text.strip().rstrip(".")
+                    if kind == "sentence":
+                        if not text:
+                            continue
+                        sentences += 1
+                    yield kind, text
+        if sentences != 6:
+            raise Exception(f"Model generated {sentences} story sentences, expected 6")
+        outcome = "completed"
+    finally:
+        elapsed = time.perf_counter() - started
+        OPENAI_CHAT_DURATION.labels(outcome, "incremental").observe(elapsed)
+        record_stage("openai chat", elapsed)
+
+def _chat_story_request(prompt: str) -> Dict[str, Any]:
+    return dict(
+        model=STORY_MODEL,
+        messages=[
+            {"role": "system", "content": STORY_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_schema", "json_schema": {"name": "story", "strict": True, "schema": STORY_SCHEMA}},
+        temperature=1.0
+    )
+
+class StoryStreamParser:
+    """Pulls the title and each sentence out of a STORY_SCHEMA document as it
+    arrives in pieces, without waiting for the JSON to be complete"""
+
+    _STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.key: Optional[str] = None
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """Add a piece of the document; returns the values it completed"""
+        self.buffer += text
+        items = []
+        while True:
+            # Outside string literals a quote always opens the next one
+            start = self.buffer.find('"', self.position)
+            if start < 0:
+                break
+            match = self._STRING.match(self.buffer, start)
+            following = self.buffer[match.end():].lstrip() if match else ""
+            if not following:
+                # Incomplete string, or not yet known to be a key or a value
+                break
+            value = json.loads(match.group(0))
+            if following[0] == ":":
+                self.key = value
+            elif self.key == "title":
+                items.append(("title", value))
+            elif self.key == "sentences":
+                items.append(("sentence", value))
+            self.position = match.end()
+        return items
 
 def generate_additional_sentences(count: int, context: str) -> List[str]:
     """This function is no longer used as we're using the assistant for story generation"""
     return ["Error generating sentence"] * count
 
-def generate_image(prompt: str) -> str:
+async def generate_image(prompt: str) -> str:
     """
     Generate an image using DALL-E for a given prompt
     
@@ -100,7 +307,7 @@ def generate_image(prompt: str) -> str:
         URL of the generated image
     """
     try:
-        response = client.images.generate(
+        response = await get_async_client().images.generate(
             model="dall-e-3",
             prompt=f"Create a comic panel illustration for: {prompt}",
             size="1024x1024",
@@ -110,30 +317,52 @@ def generate_image(prompt: str) -> str:
         
         return response.data[0].url
     except Exception as e:
-        print(f"Error generating image: {e}")
+        logger.error("Error generating image: %s", e)
         return ""
 
-async def generate_comic_panels(sentences: List[str]) -> List[Dict[str, str]]:
+async def generate_comic_panels(
+    sentences: List[str],
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None
+) -> List[Dict[str, str]]:
     """
     Generate comic panels with images for each sentence
     
+    Images are requested concurrently, at most `concurrency` at a time. A panel
+    whose image fails or exceeds `timeout` seconds keeps an empty image_url
+    instead of failing the other panels.
+    
     Args:
         sentences: List of sentences to generate images for
+        concurrency: Maximum simultaneous image requests (default PANEL_IMAGE_CONCURRENCY)
+        timeout: Seconds allowed per image (default PANEL_IMAGE_TIMEOUT)
         
     Returns:
         List of dictionaries containing sentence and image_url for each panel
     """
-    panels = []
-    for i, sentence in enumerate(sentences):
-        # Generate image for the sentence
-        image_url = generate_image(sentence)
-        
+    semaphore = asyncio.Semaphore(concurrency or PANEL_IMAGE_CONCURRENCY)
+    timeout = timeout or PANEL_IMAGE_TIMEOUT
+
+    async def render_panel(i: int, sentence: str) -> Dict[str, str]:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                # Generate image for the sentence
+                image_url = await asyncio.wait_for(generate_image(sentence), timeout)
+                outcome = "success" if image_url else "error"
+            except asyncio.TimeoutError:
+                logger.warning("Timed out generating image for panel %d after %.0fs", i + 1, timeout)
+                image_url = ""
+                outcome = "timeout"
+            elapsed = time.perf_counter() - started
+            OPENAI_IMAGE_DURATION.labels(outcome).observe(elapsed)
+            record_stage("openai image", elapsed)
+
         # Create panel data
-        panel = {
+        return {
             "sentence": sentence,
             "image_url": image_url,
             "panel_order": i + 1
         }
-        panels.append(panel)
-    
-    return panels 
\ No newline at end of file
+
+    return list(await asyncio.gather(*(render_panel(i, sentence) for i, sentence in enumerate(sentences)))) 
\ No newline at end of file
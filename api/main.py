@@ -1,23 +1,96 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+import os
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
 from .routes.comics import router as comics_router
 from .routes.stories import router as stories_router
+from .routes.jobs import router as jobs_router
+from .routes.export import router as export_router
+from .services.job_service import get_job_service
+from .services.snapshot_service import get_snapshot_service
+from .services.story_pool import get_story_pool
+from .metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, render_metrics
+from .profiling import ProfilingMiddleware, profiling_enabled
+from .integrations.openai_integration import get_async_client, close_async_client, openai_pool_stats
+from db.cache import cache_stats
+from db.executor import get_read_flights, get_supabase_executor, shutdown_supabase_executor
+from db.supabase_client import get_supabase_client, close_supabase_client, supabase_pool_stats
+from db.exceptions.database import DatabaseConnectionError
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create per-process clients and workers on startup and release them on shutdown
+    
+    Runs once in every server worker, after the fork, so no connection pool,
+    thread pool or event-loop task is shared between processes.
+    """
+    get_supabase_executor()
+    get_snapshot_service()
+    get_async_client()
+    try:
+        get_supabase_client()
+    except DatabaseConnectionError as e:
+        # Snapshots can still be served; database routes will report the error
+        logger.warning("Supabase client not initialised: %s", e)
+    await get_job_service().start()
+    await get_story_pool().start()
+    yield
+    await get_story_pool().stop()
+    await get_job_service().stop()
+    await close_async_client()
+    shutdown_supabase_executor()
+    close_supabase_client()
 
 app = FastAPI(
     title="Daily Comics API",
     description="API for generating and managing daily comics",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson renders the responses FastAPI serializes itself several times faster
+    default_response_class=ORJSONResponse
 )
 
+app.add_middleware(MetricsMiddleware)
+
+# Only installed when PROFILE_TOKEN, PROFILE_SAMPLE_RATE or SLOW_REQUEST_MS is set
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(comics_router)
 app.include_router(stories_router)
+app.include_router(jobs_router)
+app.include_router(export_router)
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+@app.get("/health/cache")
+async def cache_health():
+    """Hit/miss counters of the in-process read caches"""
+    return cache_stats()
+
+@app.get("/health/single-flight")
+async def single_flight_health():
+    """Supabase reads that ran versus shared an identical read already in flight"""
+    return get_read_flights().stats()
+
+@app.get("/health/pools")
+async def pool_health():
+    """Connection pool usage of the Supabase and OpenAI HTTP clients"""
+    return {"supabase": supabase_pool_stats(), "openai": openai_pool_stats()}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: route latency, Supabase and OpenAI timings, caches, pools"""
+    body = render_metrics({"supabase": supabase_pool_stats(), "openai": openai_pool_stats()})
+    return Response(content=body, media_type=CONTENT_TYPE_LATEST)
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler"""
@@ -27,5 +100,11 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 if __name__ == "__main__":
+    # Development server; production runs through server.py
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    uvicorn.run(
+        "api.main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("APP_PORT", 8000)),
+        reload=os.getenv("APP_DEBUG", "false").lower() == "true"
+    )
@@ -0,0 +1,149 @@
+import os
+import time
+from contextlib import contextmanager
+from db.tracing import record_stage
+from typing import Any, Callable, Dict, Iterator
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    disable_created_metrics,
+    generate_latest,
+    multiprocess
+)
+
+# *_created series double the output without helping dashboards
+disable_created_metrics()
+
+# Latency buckets in seconds, spanning cached reads to full comic generation
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+GENERATION_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=REQUEST_BUCKETS
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    multiprocess_mode="livesum"
+)
+OPENAI_RUN_DURATION = Histogram(
+    "openai_assistant_run_duration_seconds",
+    "Time from starting an assistant run until it finishes",
+    ["status"],
+    buckets=GENERATION_BUCKETS
+)
+OPENAI_RUN_POLLS = Histogram(
+    "openai_assistant_run_polls",
+    "Status polls needed per assistant run",
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34)
+)
+OPENAI_CHAT_DURATION = Histogram(
+    "openai_chat_story_duration_seconds",
+    "Story generation latency through Chat Completions",
+    ["status", "mode"],
+    buckets=GENERATION_BUCKETS
+)
+OPENAI_IMAGE_DURATION = Histogram(
+    "openai_image_duration_seconds",
+    "Image generation latency per panel",
+    ["outcome"],
+    buckets=GENERATION_BUCKETS
+)
+GENERATION_STAGE_DURATION = Histogram(
+    "generation_stage_duration_seconds",
+    "Time spent in each stage of story and comic generation",
+    ["kind", "stage"],
+    buckets=GENERATION_BUCKETS
+)
+HTTP_POOL_CONNECTIONS = Gauge(
+    "http_pool_connections",
+    "Outbound HTTP connections by client and state, sampled at scrape time",
+    ["client", "state"],
+    multiprocess_mode="liveall"
+)
+STORY_POOL_CLAIMS = Counter(
+    "story_pool_claims_total",
+    "POST /stories/generate calls by whether a pre-generated story was available",
+    ["result"]
+)
+STORY_POOL_SIZE = Gauge(
+    "story_pool_size",
+    "Pre-generated stories waiting in the pool, as last counted",
+    multiprocess_mode="livemax"
+)
+STORY_POOL_GENERATIONS = Counter(
+    "story_pool_generations_total",
+    "Stories generated to refill the pool",
+    ["outcome"]
+)
+IDEMPOTENT_REQUESTS = Counter(
+    "idempotent_requests_total",
+    "Requests carrying an Idempotency-Key, by whether they ran, joined the run in flight, replayed a stored result, conflicted or were rejected",
+    ["route", "result"]
+)
+
+@contextmanager
+def time_stage(kind: str, stage: str) -> Iterator[None]:
+    """Record how long a block of a generation flow takes"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        GENERATION_STAGE_DURATION.labels(kind, stage).observe(elapsed)
+        record_stage(f"{kind} {stage}", elapsed)
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and in-flight requests per route
+
+    Routes are labelled by their path template (/comics/{comic_id}), so
+    label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status)
+            ).observe(time.perf_counter() - started)
+
+def render_metrics(pools: Dict[str, Dict[str, int]]) -> bytes:
+    """Prometheus text exposition of every metric in this process, or in all
+    server workers when PROMETHEUS_MULTIPROC_DIR is set"""
+    for client, stats in pools.items():
+        for state in ("in_use", "idle", "waiting"):
+            HTTP_POOL_CONNECTIONS.labels(client, state).set(stats.get(state, 0))
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
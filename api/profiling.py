@@ -0,0 +1,208 @@
+"""Opt-in request profiling and slow-request logging
+
+Nothing here runs unless one of these is set; without them the middleware is
+not even installed:
+
+- PROFILE_TOKEN: requests sending ``X-Profile: <token>`` are profiled
+- PROFILE_SAMPLE_RATE: fraction of requests profiled at random (e.g. 0.01)
+- SLOW_REQUEST_MS: requests slower than this are logged with a stage breakdown
+
+A profiled request is sampled every PROFILE_INTERVAL_MS by a background
+thread that walks the request task's await chain, the code running on the
+event loop for it, and the executor threads blocked in Supabase calls on its
+behalf. Samples are written to PROFILE_DIR in the folded-stack format read by
+flamegraph.pl, speedscope and inferno; the response carries the file name in
+``X-Profile-Id``.
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+import logging
+import threading
+from collections import Counter
+from types import FrameType
+from typing import Any, Callable, Dict, List, Optional
+from db.tracing import RequestTrace, current_trace
+
+logger = logging.getLogger(__name__)
+
+def profiling_enabled() -> bool:
+    """Whether any profiling or slow-request logging is configured"""
+    return bool(
+        os.environ.get("PROFILE_TOKEN")
+        or float(os.environ.get("PROFILE_SAMPLE_RATE", 0)) > 0
+        or os.environ.get("SLOW_REQUEST_MS")
+    )
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _thread_frames(frame: Optional[FrameType]) -> List[FrameType]:
+    """Frames of a thread stack, outermost first"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+def _await_chain(task: "asyncio.Task") -> List[FrameType]:
+    """Frames of a task's suspended or running coroutines, outermost first"""
+    frames = []
+    coro: Any = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+class RequestProfile:
+    """Wall-clock stack samples of one request"""
+
+    def __init__(self, name: str, task: "asyncio.Task", trace: RequestTrace, loop_thread: int):
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.name = name
+        self.task = task
+        self.trace = trace
+        self.loop_thread = loop_thread
+        self.samples: Counter = Counter()
+
+    def sample(self, thread_frames: Dict[int, FrameType]) -> None:
+        chain = _await_chain(self.task)
+        if not chain:
+            return
+        stack = [self.name] + [_label(frame) for frame in chain]
+
+        # Code currently executing on the loop for this request (not just awaiting)
+        loop_stack = _thread_frames(thread_frames.get(self.loop_thread))
+        if chain[-1] in loop_stack:
+            stack += [_label(frame) for frame in loop_stack[loop_stack.index(chain[-1]) + 1:]]
+
+        # Blocking calls running in executor threads on this request's behalf
+        blocked = [ident for ident in list(self.trace.threads) if ident in thread_frames]
+        if blocked:
+            for ident in blocked:
+                self.samples[";".join(stack + ["[executor]"] + [_label(f) for f in _thread_frames(thread_frames[ident])])] += 1
+        else:
+            self.samples[";".join(stack)] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+class Sampler:
+    """Background thread sampling every active profile at a fixed interval"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._profiles: Dict[str, RequestProfile] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles.pop(profile.id, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                profiles = list(self._profiles.values())
+                if not profiles:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for profile in profiles:
+                try:
+                    profile.sample(frames)
+                except (RuntimeError, ValueError):
+                    # The stack changed under us; skip this sample
+                    pass
+            time.sleep(self.interval)
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles opted-in requests and logs slow ones"""
+
+    def __init__(self, app: Any):
+        self.app = app
+        self.token = os.environ.get("PROFILE_TOKEN")
+        self.sample_rate = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+        slow_ms = os.environ.get("SLOW_REQUEST_MS")
+        self.slow_threshold = float(slow_ms) / 1000 if slow_ms else None
+        self.directory = os.environ.get("PROFILE_DIR", "profiles")
+        self.sampler = Sampler(float(os.environ.get("PROFILE_INTERVAL_MS", 5)) / 1000)
+
+    def _wants_profile(self, scope: Dict[str, Any]) -> bool:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == b"x-profile" and value.decode() == self.token:
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile_request = self._wants_profile(scope)
+        if not profile_request and self.slow_threshold is None:
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        reset_token = current_trace.set(trace)
+        profile = None
+        if profile_request:
+            profile = RequestProfile(
+                f"{scope['method']} {scope['path']}", asyncio.current_task(), trace, threading.get_ident()
+            )
+            self.sampler.add(profile)
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if profile and message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_trace.reset(reset_token)
+            if profile:
+                self.sampler.remove(profile)
+                self._store(profile)
+            if self.slow_threshold is not None and elapsed >= self.slow_threshold:
+                self._log_slow(scope, elapsed, trace, profile)
+
+    def _store(self, profile: RequestProfile) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{profile.id}.folded"), "w") as f:
+                f.write(profile.folded())
+        except OSError as e:
+            logger.warning("Failed to store profile %s: %s", profile.id, e)
+
+    def _log_slow(self, scope: Dict[str, Any], elapsed: float, trace: RequestTrace, profile: Optional[RequestProfile]) -> None:
+        route = getattr(scope.get("route"), "path", scope["path"])
+        stages = ", ".join(
+            f"{stage} {total * 1000:.0f}ms x{calls}"
+            for stage, (total, calls) in sorted(trace.stages.items(), key=lambda item: -item[1][0])
+        )
+        logger.warning(
+            "Slow request %s %s took %.0fms: %s%s",
+            scope["method"], route, elapsed * 1000, stages or "no recorded stages",
+            f" (profile {profile.id})" if profile else ""
+        )
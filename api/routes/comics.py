@@ -1,9 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from typing import List, Optional
 from db.supabase_client import get_supabase_client
 from supabase import Client
-from models.comic import Comic, ComicCreate, ComicUpdate
+from models.comic import Comic, ComicCreate, ComicUpdate, ComicList, ComicBatchResult
+from db.pagination import MAX_PAGE_SIZE
+from models.job import Job
 from api.services.comic_service import ComicService
+from api.services.job_service import JobService, get_job_service
+from api.http_cache import conditional
+from api.idempotency import IdempotencyStore, get_idempotency_store
 from datetime import date
 
 router = APIRouter(
@@ -12,22 +19,58 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-@router.get("/", response_model=List[Comic])
+@router.get("/", response_model=ComicList)
 async def get_all_comics(
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    date_from: Optional[date] = Query(None, description="Earliest comic date (inclusive)"),
+    date_to: Optional[date] = Query(None, description="Latest comic date (inclusive)"),
     comic_service: ComicService = Depends(ComicService),
     supabase: Client = Depends(get_supabase_client)
 ):
-    """Get all comics"""
-    return await comic_service.get_all_comics(supabase)
+    """List comics newest first, with cursor pagination"""
+    comics = await comic_service.get_all_comics(supabase, limit, cursor, date_from, date_to)
+    return conditional(request, response, comics, "comic_list")
+
+@router.get("/today", response_model=Comic)
+async def get_todays_comic(
+    request: Request,
+    response: Response,
+    comic_service: ComicService = Depends(ComicService),
+    supabase: Client = Depends(get_supabase_client)
+):
+    """Get today's comic, served from its precomputed snapshot"""
+    snapshot = await comic_service.get_comic_snapshot(date.today(), supabase)
+    return conditional(request, response, snapshot.response(), "comic_current", etag=snapshot.etag)
+
+@router.get("/by-date/{day}", response_model=Comic)
+async def get_comic_by_date(
+    day: date,
+    request: Request,
+    response: Response,
+    comic_service: ComicService = Depends(ComicService),
+    supabase: Client = Depends(get_supabase_client)
+):
+    """Get the comic of a date (YYYY-MM-DD), served from its precomputed snapshot"""
+    snapshot = await comic_service.get_comic_snapshot(day, supabase)
+    policy = "comic_archive" if day < date.today() else "comic_current"
+    return conditional(request, response, snapshot.response(), policy, etag=snapshot.etag)
 
 @router.get("/{comic_id}", response_model=Comic)
 async def get_comic(
     comic_id: int, 
+    request: Request,
+    response: Response,
     comic_service: ComicService = Depends(ComicService),
     supabase: Client = Depends(get_supabase_client)
 ):
-    """Get a specific comic by ID"""
-    return await comic_service.get_comic_by_id(comic_id, supabase)
+    """Get a specific comic by ID.
+    Comics for past dates are served as immutable; send If-None-Match to revalidate."""
+    comic = await comic_service.get_comic_by_id(comic_id, supabase)
+    policy = "comic_archive" if comic.date < date.today().isoformat() else "comic_current"
+    return conditional(request, response, comic.response(), policy, etag=comic.etag)
 
 @router.post("/", response_model=Comic)
 async def create_comic(
@@ -48,11 +91,48 @@ async def update_comic(
     """Update an existing comic"""
     return await comic_service.update_comic(comic_id, comic, supabase)
 
-@router.post("/generate", response_model=Comic)
+@router.post("/generate", response_model=Comic, responses={202: {"model": Job}})
 async def generate_comic(
+    request: Request,
+    prompt: str = "Create a short funny comic story, with 6 sentences",
+    background: bool = Query(False, description="Queue the generation and return a job instead of waiting"),
+    idempotency_key: Optional[str] = Header(None, max_length=255, description="Retries with the same key return the original comic (or job)"),
+    comic_service: ComicService = Depends(ComicService),
+    job_service: JobService = Depends(get_job_service),
+    idempotency: IdempotencyStore = Depends(get_idempotency_store),
+    supabase: Client = Depends(get_supabase_client)
+):
+    """Generate a new comic story and store it in Supabase.
+    With background=true the comic is generated by a worker; poll GET /jobs/{id} for the result.
+    With an Idempotency-Key, a retry waits for the original generation, or returns its result once done."""
+    async def generate():
+        if background:
+            job = await job_service.enqueue("comic", lambda: comic_service.generate_comic(prompt, supabase))
+            return JSONResponse(status_code=202, content=jsonable_encoder(job), headers={"Location": f"/jobs/{job.id}"})
+        return await comic_service.generate_comic(prompt, supabase)
+    return await idempotency.run(idempotency_key, request, Comic, generate, supabase)
+
+@router.post("/generate-batch", response_model=ComicBatchResult, responses={202: {"model": Job}})
+async def generate_comic_batch(
+    count: int = Query(..., ge=1, le=ComicService.BATCH_MAX, description="Number of comics to generate"),
+    start: Optional[date] = Query(None, description="Date of the first comic (default: today); the others follow day by day"),
     prompt: str = "Create a short funny comic story, with 6 sentences",
+    concurrency: Optional[int] = Query(None, ge=1, le=32, description="Comics generated at once (default COMIC_BATCH_CONCURRENCY)"),
+    background: bool = Query(False, description="Queue the batch and return a job instead of waiting"),
     comic_service: ComicService = Depends(ComicService),
+    job_service: JobService = Depends(get_job_service),
     supabase: Client = Depends(get_supabase_client)
 ):
-    """Generate a new comic story and store it in Supabase"""
-    return await comic_service.generate_comic(prompt, supabase) 
\ No newline at end of file
+    """Generate comics for consecutive dates, several at a time.
+    Comics that fail are listed in `failed` and do not stop the others.
+    With background=true, GET /jobs/{id} reports progress (generated, created, failed, total) while the batch runs."""
+    start = start or date.today()
+    if background:
+        job = None
+        def report(progress):
+            job.progress = progress
+        job = await job_service.enqueue("comic_batch", lambda: comic_service.generate_batch(
+            count, start, supabase, prompt, concurrency, on_progress=report
+        ))
+        return JSONResponse(status_code=202, content=jsonable_encoder(job), headers={"Location": f"/jobs/{job.id}"})
+    return await comic_service.generate_batch(count, start, supabase, prompt, concurrency)
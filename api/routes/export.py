@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import Literal
+from datetime import date
+from db.supabase_client import get_supabase_client
+from db.archive import export_archive
+from supabase import Client
+
+router = APIRouter(
+    prefix="/export",
+    tags=["export"],
+)
+
+@router.get(
+    "",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}, "description": "One JSON object per line"}}
+)
+async def export(
+    format: Literal["ndjson"] = Query("ndjson", description="Output format"),
+    page_size: int = Query(500, ge=1, le=999, description="Rows read per database request"),
+    supabase: Client = Depends(get_supabase_client)
+):
+    """Stream the whole archive: every story, then every comic, then every panel,
+    one {"table", "row"} object per line. The body is produced page by page, so
+    an export that fails part way ends in a truncated download."""
+    return StreamingResponse(
+        export_archive(supabase, page_size),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="archive-{date.today().isoformat()}.ndjson"'}
+    )
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+from models.job import Job
+from api.services.job_service import JobService, get_job_service
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["jobs"],
+    responses={404: {"description": "Not found"}},
+)
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(
+    job_id: str,
+    job_service: JobService = Depends(get_job_service)
+):
+    """Get the status, and once finished the result, of a background job"""
+    return job_service.get_job(job_id)
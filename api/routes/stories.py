@@ -1,10 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Any, AsyncIterator, List, Optional, Literal, Tuple
 from db.supabase_client import get_supabase_client
 from supabase import Client
 from models.story import Story, StoryCreate, StoryResponse, StoryList
+from models.job import Job
 from api.services.story_service import StoryService
+from api.services.job_service import JobService, get_job_service
+from api.services.story_pool import StoryPool, get_story_pool
+from api.http_cache import conditional
+from api.idempotency import IdempotencyStore, get_idempotency_store
 from datetime import datetime
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/stories",
@@ -12,32 +23,105 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
-@router.post("/generate", response_model=StoryResponse)
+@router.post("/generate", response_model=StoryResponse, responses={202: {"model": Job}})
 async def generate_story(
+    request: Request,
     prompt: str = "",
+    background: bool = Query(False, description="Queue the generation and return a job instead of waiting"),
+    idempotency_key: Optional[str] = Header(None, max_length=255, description="Retries with the same key return the original story (or job)"),
     story_service: StoryService = Depends(StoryService),
+    job_service: JobService = Depends(get_job_service),
+    story_pool: StoryPool = Depends(get_story_pool),
+    idempotency: IdempotencyStore = Depends(get_idempotency_store),
     supabase: Client = Depends(get_supabase_client)
 ):
     """Generate a new story using OpenAI and save it to the database.
-    Note: The prompt parameter is ignored as we use a fixed prompt for consistency."""
-    return await story_service.generate_and_save_story(prompt, supabase)
+    Note: The prompt parameter is ignored as we use a fixed prompt for consistency.
+    A pre-generated story is returned straight away when the story pool has one.
+    With background=true the story is generated by a worker; poll GET /jobs/{id} for the result.
+    With an Idempotency-Key, a retry waits for the original generation, or returns its result once done."""
+    async def generate():
+        story = await story_pool.claim(supabase)
+        if story is not None:
+            return story
+        if background:
+            job = await job_service.enqueue("story", lambda: story_service.generate_and_save_story(prompt, supabase))
+            return JSONResponse(status_code=202, content=jsonable_encoder(job), headers={"Location": f"/jobs/{job.id}"})
+        return await story_service.generate_and_save_story(prompt, supabase)
+    return await idempotency.run(idempotency_key, request, StoryResponse, generate, supabase)
+
+@router.get(
+    "/generate/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}, "description": "Server-sent events"}}
+)
+async def stream_story(
+    story_service: StoryService = Depends(StoryService),
+    story_pool: StoryPool = Depends(get_story_pool),
+    supabase: Client = Depends(get_supabase_client)
+):
+    """Generate a new story and stream it as server-sent events.
+    Sends a `title` event, then a `sentence` event ({"index", "text"}) for each
+    sentence as the model writes it, and finally a `story` event with the
+    stored record. Failures are reported as an `error` event ({"detail"})."""
+    story = await story_pool.claim(supabase)
+    if story is not None:
+        events = story_service.replay_story(story)
+    else:
+        events = story_service.stream_and_save_story(supabase)
+    return StreamingResponse(
+        _server_sent_events(events),
+        media_type="text/event-stream",
+        # Keep proxies from caching or buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _sse(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n".encode()
+
+async def _server_sent_events(events: AsyncIterator[Tuple[str, Any]]) -> AsyncIterator[bytes]:
+    # A comment first, so the client sees the response before the model starts
+    yield b": generating\n\n"
+    index = 0
+    try:
+        async for kind, value in events:
+            if kind == "title":
+                yield _sse("title", {"title": value})
+            elif kind == "sentence":
+                index += 1
+                yield _sse("sentence", {"index": index, "text": value})
+            else:
+                yield _sse(kind, value)
+    except HTTPException as e:
+        yield _sse("error", {"detail": e.detail})
+    except Exception as e:
+        logger.exception("Story stream failed")
+        yield _sse("error", {"detail": f"Failed to generate and save story: {str(e)}"})
 
 @router.get("/", response_model=StoryList)
 async def list_stories(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Items per page"),
-    search: Optional[str] = Query(None, description="Search by title"),
+    search: Optional[str] = Query(None, description="Full-text search; the newest 1100 matches are ranked by relevance"),
+    fields: Literal["all", "title", "story"] = Query("all", description="Fields to search"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; overrides page"),
     story_service: StoryService = Depends(StoryService),
     supabase: Client = Depends(get_supabase_client)
 ):
     """List stories with pagination and search"""
-    return await story_service.list_stories(page, page_size, search, supabase)
+    stories = await story_service.list_stories(page, page_size, search, supabase, cursor, fields)
+    return conditional(request, response, stories, "story_list")
 
 @router.get("/{story_id}", response_model=StoryResponse)
 async def get_story(
     story_id: int,
+    request: Request,
+    response: Response,
     story_service: StoryService = Depends(StoryService),
     supabase: Client = Depends(get_supabase_client)
 ):
     """Get story details by ID"""
-    return await story_service.get_story_by_id(story_id, supabase) 
\ No newline at end of file
+    story = await story_service.get_story_by_id(story_id, supabase)
+    return conditional(request, response, story.response(), "story", last_modified=story.model.created_at, etag=story.etag) 
\ No newline at end of file
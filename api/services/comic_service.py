@@ -1,23 +1,81 @@
-from typing import List
+import os
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
 from fastapi import HTTPException
+from openai import RateLimitError
 from supabase import Client
-from models.comic import Comic, ComicCreate, ComicUpdate
-from api.integrations.openai_integration import generate_story, generate_comic_panels
-from datetime import date
+from db.cache import get_cache
+from db.executor import run_query
+from db.pagination import apply_keyset, split_page
+from db.exceptions.database import DatabaseError, RecordNotFoundError, ValidationError
+from db.repositories.comic_repository import ComicRepository, with_relations
+from models.comic import Comic, ComicCreate, ComicUpdate, ComicList
+from api.integrations.openai_integration import generate_comic_panels, request_story
+from api.services.snapshot_service import ComicSnapshot, get_snapshot_service
+from api.metrics import time_stage
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
 
 class ComicService:
-    async def get_all_comics(self, supabase: Client) -> List[Comic]:
-        """Get all comics from the database"""
-        response = supabase.table("comics").select("*").execute()
+    # Keyset order for listings, served by the comics_date_id_idx index
+    LIST_ORDER = ("date", "id")
+    
+    # Batch generation: comics generated at once, comics per write, and
+    # retries (after the Retry-After delay) of a comic hitting a rate limit
+    BATCH_MAX = 100
+    BATCH_CONCURRENCY = int(os.environ.get("COMIC_BATCH_CONCURRENCY", 4))
+    BATCH_WRITE_SIZE = int(os.environ.get("COMIC_BATCH_WRITE_SIZE", 10))
+    BATCH_RETRIES = int(os.environ.get("COMIC_BATCH_RETRIES", 2))
+    BATCH_RATE_LIMIT_BACKOFF = 10.0
+
+    async def get_all_comics(
+        self,
+        supabase: Client,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> ComicList:
+        """Get one page of comics, newest first, with panels and stories"""
+        query = with_relations(supabase.table("comics").select("*"))
+        if date_from:
+            query = query.gte("date", date_from.isoformat())
+        if date_to:
+            query = query.lte("date", date_to.isoformat())
+        
+        try:
+            query = apply_keyset(query, self.LIST_ORDER, limit, cursor, desc=True)
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        response = await run_query(query)
         
         if hasattr(response, 'error') and response.error:
             raise HTTPException(status_code=500, detail=f"Supabase error: {response.error.message}")
         
-        return response.data
+        items, next_cursor = split_page(response.data, self.LIST_ORDER, limit)
+        return ComicList(items=items, limit=limit, next_cursor=next_cursor)
 
-    async def get_comic_by_id(self, comic_id: int, supabase: Client) -> Comic:
-        """Get a specific comic by ID"""
-        response = supabase.table("comics").select("*").eq("id", comic_id).execute()
+    async def get_comic_by_id(self, comic_id: int, supabase: Client) -> ComicSnapshot:
+        """Get a specific comic by ID, with its panels and story, pre-rendered
+        
+        Comics rarely change once generated, so reads are served from the
+        in-process cache. Entries are validated and rendered once, when they
+        are stored, and carry the ETag of their body.
+        """
+        return await get_cache("comics").get_or_load(
+            ("rendered", comic_id),
+            lambda: self._load_comic(comic_id, supabase)
+        )
+
+    async def _load_comic(self, comic_id: int, supabase: Client) -> ComicSnapshot:
+        return ComicSnapshot.from_comic(await self._fetch_comic(comic_id, supabase))
+
+    async def _fetch_comic(self, comic_id: int, supabase: Client) -> Dict[str, Any]:
+        response = await run_query(with_relations(supabase.table("comics").select("*")).eq("id", comic_id))
         
         if hasattr(response, 'error') and response.error:
             raise HTTPException(status_code=500, detail=f"Supabase error: {response.error.message}")
@@ -27,79 +85,230 @@ class ComicService:
         
         return response.data[0]
 
+    async def get_comic_snapshot(self, day: date, supabase: Client) -> ComicSnapshot:
+        """Get the pre-rendered comic of a date
+        
+        Served from the snapshot store; Supabase is only queried for dates
+        that have no snapshot yet, and the result is snapshotted.
+        """
+        snapshots = get_snapshot_service()
+        snapshot = snapshots.get(day.isoformat())
+        if snapshot:
+            return snapshot
+        
+        try:
+            comic = await ComicRepository(supabase).find_latest_by_date(day.isoformat())
+        except RecordNotFoundError:
+            raise HTTPException(status_code=404, detail=f"No comic for {day.isoformat()}")
+        except DatabaseError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        
+        return snapshots.put(comic)
+
     async def create_comic(self, comic: ComicCreate, supabase: Client) -> Comic:
         """Create a new comic"""
-        response = supabase.table("comics").insert(comic.dict()).execute()
+        response = await run_query(with_relations(supabase.table("comics").insert(comic.model_dump(mode="json"))))
         
         if hasattr(response, 'error') and response.error:
             raise HTTPException(status_code=500, detail=f"Supabase error: {response.error.message}")
         
-        return response.data[0]
+        return self._cache_comic(response.data[0])
 
     async def update_comic(self, comic_id: int, comic: ComicUpdate, supabase: Client) -> Comic:
         """Update an existing comic"""
         # Remove None values from the update dict
-        update_data = {k: v for k, v in comic.dict().items() if v is not None}
+        update_data = {k: v for k, v in comic.model_dump(mode="json").items() if v is not None}
         
         if not update_data:
             raise HTTPException(status_code=400, detail="No valid fields to update")
         
-        response = supabase.table("comics").update(update_data).eq("id", comic_id).execute()
+        response = await run_query(with_relations(supabase.table("comics").update(update_data)).eq("id", comic_id))
         
         if hasattr(response, 'error') and response.error:
             raise HTTPException(status_code=500, detail=f"Supabase error: {response.error.message}")
         
+        # Drop any cached copy, even if the comic has disappeared meanwhile
+        ComicRepository(supabase).invalidate(comic_id)
+        # Also drops the snapshot filed under the date the comic had before
+        get_snapshot_service().discard_comic(comic_id)
+        
         if not response.data:
             raise HTTPException(status_code=404, detail="Comic not found")
         
-        return response.data[0]
+        return self._cache_comic(response.data[0])
+
+    def _cache_comic(self, comic: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a freshly written comic so the next read skips the database"""
+        cache = get_cache("comics")
+        cache.set(("relations", comic["id"]), comic)
+        cache.set(("rendered", comic["id"]), ComicSnapshot.from_comic(comic))
+        get_snapshot_service().put(comic)
+        return comic
 
     async def generate_comic(self, prompt: str, supabase: Client) -> Comic:
         """Generate a new comic story and store it in Supabase"""
-        # Generate story with 6 sentences
-        title, sentences = generate_story(prompt)
+        # Generate story: the title followed by 6 story sentences. Fail
+        # before any image is rendered or anything is written
+        try:
+            with time_stage("comic", "story"):
+                title, sentences = await request_story(prompt)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Failed to generate story: {str(e)}")
+        title = title.strip('"').strip()
+        story_sentences = sentences[1:]
         
-        if len(sentences) != 6:
-            raise HTTPException(status_code=500, detail="Failed to generate exactly 6 sentences")
+        if len(story_sentences) != 6:
+            raise HTTPException(status_code=502, detail="Failed to generate exactly 6 sentences")
         
-        # Create comic in database
+        # Render the panel images before touching the database
+        with time_stage("comic", "panels"):
+            panels = await generate_comic_panels(story_sentences)
+        
+        # Create the story, comic and panels in a single transaction
         comic_data = {
             "title": title,
             "date": date.today().isoformat()
         }
+        story_data = {
+            "title": title,
+            "story": ". ".join(story_sentences) + "."
+        }
         
-        # Insert comic
-        comic_response = supabase.table("comics").insert(comic_data).execute()
-        
-        if hasattr(comic_response, 'error') and comic_response.error:
-            raise HTTPException(status_code=500, detail=f"Supabase error: {comic_response.error.message}")
-        
-        if not comic_response.data:
-            raise HTTPException(status_code=500, detail="Failed to create comic")
-        
-        comic_id = comic_response.data[0]['id']
-        
-        # Create panels with just the sentences (no images)
-        panels = []
-        for i, sentence in enumerate(sentences):
-            panel = {
-                "comic_id": comic_id,
-                "sentence": sentence,
-                "image_url": "",  # Empty image URL since we're not generating images
-                "panel_order": i + 1
-            }
-            panels.append(panel)
-        
-        # Insert panels
-        panels_response = supabase.table("panels").insert(panels).execute()
-        
-        if hasattr(panels_response, 'error') and panels_response.error:
-            # If panels insertion fails, delete the comic to avoid orphaned records
-            supabase.table("comics").delete().eq("id", comic_id).execute()
-            raise HTTPException(status_code=500, detail=f"Supabase error: {panels_response.error.message}")
+        try:
+            with time_stage("comic", "save"):
+                comic = await ComicRepository(supabase).create_with_panels(comic_data, panels, story_data)
+        except DatabaseError as e:
+            raise HTTPException(status_code=500, detail=str(e))
         
-        # Get the complete comic with panels
-        result = comic_response.data[0]
-        result["panels"] = panels_response.data
+        # Build today's snapshot now rather than on the first read
+        get_snapshot_service().put(comic)
+        return comic
+
+
+    async def generate_batch(
+        self,
+        count: int,
+        start: date,
+        supabase: Client,
+        prompt: str = "Create a short funny comic story, with 6 sentences",
+        concurrency: Optional[int] = None,
+        on_progress: Optional[Callable[[Dict[str, int]], None]] = None
+    ) -> Dict[str, Any]:
+        """Generate `count` comics dated `start`, the day after, and so on
         
-        return result 
\ No newline at end of file
+        Up to `concurrency` comics (default BATCH_CONCURRENCY) are generated
+        at a time, so wall time grows with count / concurrency rather than
+        with count. A rate-limited comic is retried after the Retry-After
+        delay, and no new comic starts before then. Finished comics are
+        written BATCH_WRITE_SIZE at a time with create_comics_with_panels.
+        A comic that fails is reported in `failed` without stopping the rest;
+        on_progress receives the generated, created (written), failed and
+        total counts whenever one of them changes.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.BATCH_CONCURRENCY)
+        loop = asyncio.get_running_loop()
+        repository = ComicRepository(supabase)
+        resume_at = 0.0
+        generated = 0
+        pending: List[tuple] = []
+        created: Dict[int, Comic] = {}
+        failed: List[Dict[str, Any]] = []
+        write_lock = asyncio.Lock()
+
+        def report() -> None:
+            if on_progress:
+                on_progress({"generated": generated, "created": len(created), "failed": len(failed), "total": count})
+
+        def fail(index: int, error: str) -> None:
+            logger.warning("Batch comic %d (%s) failed: %s", index, start + timedelta(days=index), error)
+            failed.append({"index": index, "date": start + timedelta(days=index), "error": error})
+            report()
+
+        async def flush() -> None:
+            async with write_lock:
+                batch = pending[:]
+                del pending[:]
+                if not batch:
+                    return
+                try:
+                    with time_stage("comic", "save"):
+                        comics = await repository.create_many_with_panels([item for _, item in batch])
+                except Exception as e:
+                    # Any failed write (PostgREST or transport error) only fails its own comics
+                    for index, _ in batch:
+                        fail(index, f"Failed to save comic: {e}")
+                    return
+                for (index, _), comic in zip(batch, comics):
+                    created[index] = comic
+                    get_snapshot_service().put(comic)
+                report()
+
+        async def generate(index: int) -> None:
+            nonlocal resume_at, generated
+            day = start + timedelta(days=index)
+            async with semaphore:
+                for attempt in range(self.BATCH_RETRIES + 1):
+                    delay = resume_at - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    try:
+                        with time_stage("comic", "story"):
+                            title, sentences = await request_story(prompt)
+                        if len(sentences) != 7:
+                            raise ValueError("Failed to generate exactly 6 sentences")
+                        with time_stage("comic", "panels"):
+                            panels = await generate_comic_panels(sentences[1:])
+                        break
+                    except RateLimitError as e:
+                        if attempt == self.BATCH_RETRIES:
+                            fail(index, f"Rate limited: {e}")
+                            return
+                        wait = _retry_after_seconds(e.response.headers.get("retry-after"))
+                        if wait is None:
+                            wait = self.BATCH_RATE_LIMIT_BACKOFF * 2 ** attempt
+                        resume_at = max(resume_at, loop.time() + wait)
+                        logger.warning("Rate limited generating batch comic %d, retrying in %.0fs", index, wait)
+                    except Exception as e:
+                        fail(index, str(e))
+                        return
+            
+            title = title.strip('"').strip()
+            generated += 1
+            report()
+            pending.append((index, {
+                "comic_data": {"title": title, "date": day.isoformat()},
+                "panels_data": panels,
+                "story_data": {"title": title, "story": ". ".join(sentences[1:]) + "."}
+            }))
+            if len(pending) >= self.BATCH_WRITE_SIZE:
+                await flush()
+
+        # Exceptions are collected rather than raised, so one comic never
+        # abandons the others while their generations keep running
+        results = await asyncio.gather(*(generate(index) for index in range(count)), return_exceptions=True)
+        await flush()
+        reported = set(created) | {failure["index"] for failure in failed}
+        for index, result in enumerate(results):
+            if isinstance(result, Exception) and index not in reported:
+                fail(index, str(result))
+        return {
+            "requested": count,
+            "created": [created[index] for index in sorted(created)],
+            "failed": sorted(failed, key=lambda failure: failure["index"])
+        }
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, given as seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
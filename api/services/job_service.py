@@ -0,0 +1,105 @@
+import os
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from fastapi import HTTPException
+from models.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[[], Awaitable[Dict[str, Any]]]
+
+class JobService:
+    """In-process queue for long-running generation work
+
+    Jobs are queued from request handlers and picked up by a fixed number of
+    worker tasks running on the application's event loop. Finished jobs are
+    kept in a bounded history so clients can poll for their result.
+    """
+
+    def __init__(self, workers: int = 2, history_size: int = 1000):
+        self.workers = workers
+        self.history_size = history_size
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running event loop"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks; queued jobs are marked as failed"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self._jobs.values():
+            if job.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+                self._finish(job, error="Server shut down before the job finished")
+
+    async def enqueue(self, kind: str, func: JobFunc) -> Job:
+        """Queue a coroutine factory and return its job record"""
+        await self.start()
+        job = Job(id=uuid.uuid4().hex, kind=kind)
+        self._jobs[job.id] = job
+        self._evict()
+        self._queue.put_nowait((job, func))
+        return job
+
+    def get_job(self, job_id: str) -> Job:
+        """Get a job by ID"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job, func = await self._queue.get()
+            job.status = JobStatus.RUNNING
+            job.started_at = datetime.utcnow()
+            try:
+                self._finish(job, result=await func())
+            except asyncio.CancelledError:
+                self._finish(job, error="Job was cancelled")
+                raise
+            except HTTPException as e:
+                self._finish(job, error=str(e.detail))
+            except Exception as e:
+                logger.exception(f"Job {job.id} failed")
+                self._finish(job, error=str(e))
+            finally:
+                self._queue.task_done()
+
+    def _finish(self, job: Job, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        job.status = JobStatus.FAILED if error else JobStatus.SUCCEEDED
+        job.result = result
+        job.error = error
+        job.finished_at = datetime.utcnow()
+
+    def _evict(self) -> None:
+        """Drop the oldest finished jobs once the history is full"""
+        excess = len(self._jobs) - self.history_size
+        if excess <= 0:
+            return
+        for job_id in [
+            job.id for job in self._jobs.values()
+            if job.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+        ][:excess]:
+            del self._jobs[job_id]
+
+@lru_cache()
+def get_job_service() -> JobService:
+    """Returns the process-wide JobService instance (cached)"""
+    return JobService(
+        workers=int(os.environ.get("JOB_WORKERS", 2)),
+        history_size=int(os.environ.get("JOB_HISTORY_SIZE", 1000))
+    )
@@ -0,0 +1,175 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional, Set, Tuple
+from fastapi import Response
+from db.repositories.comic_repository import on_panels_changed
+from api.http_cache import body_etag
+from models.comic import Comic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_DIR = "snapshots"
+
+class ComicSnapshot:
+    """A comic with panels and story, pre-rendered as the JSON response body"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = body_etag(body)
+        comic = json.loads(body)
+        self.date: str = comic["date"]
+        self.comic_id: int = comic["id"]
+
+    @classmethod
+    def from_comic(cls, comic: Dict[str, Any]) -> "ComicSnapshot":
+        return cls(Comic.model_validate(comic).model_dump_json().encode())
+
+    def response(self) -> Response:
+        return Response(content=self.body, media_type="application/json")
+
+class SnapshotService:
+    """Fully assembled comics by date, kept in memory and mirrored to local disk
+
+    Snapshots are written when a comic is generated, created or updated, and
+    the newest comic of a date wins. Reads never touch Supabase once a
+    snapshot exists, so today's comic keeps being served through an outage
+    and across restarts. Workers sharing the directory pick up each other's
+    writes by checking the file's modification time. Next to the snapshots,
+    by-comic/<id> lists the dates a comic was snapshotted under, so its
+    snapshots can be found again after it moves to another date.
+    """
+
+    def __init__(self, directory: Optional[str] = DEFAULT_SNAPSHOT_DIR):
+        self.directory = directory or None
+        self._snapshots: Dict[str, Tuple[int, ComicSnapshot]] = {}
+        # Dates whose snapshot this process has seen built from each comic
+        self._days_by_comic: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        if self.directory:
+            try:
+                os.makedirs(os.path.join(self.directory, "by-comic"), exist_ok=True)
+            except OSError as e:
+                logger.warning("Keeping snapshots in memory only, cannot use %s: %s", self.directory, e)
+                self.directory = None
+
+    def _path(self, day: str) -> str:
+        return os.path.join(self.directory, f"{day}.json")
+
+    def _index_path(self, comic_id: int) -> str:
+        return os.path.join(self.directory, "by-comic", str(comic_id))
+
+    def _indexed_days(self, comic_id: int) -> Set[str]:
+        """Dates a comic's snapshots were written under, by any worker"""
+        if not self.directory:
+            return set()
+        try:
+            with open(self._index_path(comic_id), "rb") as f:
+                return set(json.loads(f.read()))
+        except FileNotFoundError:
+            return set()
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable snapshot index of comic %s: %s", comic_id, e)
+            return set()
+
+    def _mtime(self, day: str) -> int:
+        try:
+            return os.stat(self._path(day)).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def get(self, day: str) -> Optional[ComicSnapshot]:
+        """Get the snapshot for a date (YYYY-MM-DD), or None if there is none"""
+        entry = self._snapshots.get(day)
+        if not self.directory:
+            return entry[1] if entry else None
+
+        mtime = self._mtime(day)
+        if entry and entry[0] == mtime:
+            return entry[1]
+        if not mtime:
+            self._snapshots.pop(day, None)
+            return None
+
+        try:
+            with open(self._path(day), "rb") as f:
+                snapshot = ComicSnapshot(f.read())
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable snapshot for %s: %s", day, e)
+            return entry[1] if entry else None
+        self._remember(day, mtime, snapshot)
+        return snapshot
+
+    def put(self, comic: Dict[str, Any]) -> ComicSnapshot:
+        """Store a comic as the snapshot for its date unless a newer comic holds it"""
+        snapshot = ComicSnapshot.from_comic(comic)
+        with self._lock:
+            current = self.get(snapshot.date)
+            if current and current.comic_id > snapshot.comic_id:
+                return current
+            self._remember(snapshot.date, self._write(snapshot), snapshot)
+            days = self._indexed_days(snapshot.comic_id)
+            if snapshot.date not in days:
+                self._replace(self._index_path(snapshot.comic_id), json.dumps(sorted(days | {snapshot.date})).encode())
+        return snapshot
+
+    def _remember(self, day: str, mtime: int, snapshot: ComicSnapshot) -> None:
+        self._snapshots[day] = (mtime, snapshot)
+        self._days_by_comic.setdefault(snapshot.comic_id, set()).add(day)
+
+    def discard_comic(self, comic_id: int) -> None:
+        """Drop every snapshot built from a comic, e.g. before it moves to another date
+
+        The dates come from this process's memory and the comic's on-disk
+        index, so snapshots other workers wrote, or written before a
+        restart, are found as well. Only those dates are read, never the
+        whole archive.
+        """
+        with self._lock:
+            for day in self._days_by_comic.pop(comic_id, set()) | self._indexed_days(comic_id):
+                snapshot = self.get(day)
+                if snapshot and snapshot.comic_id == comic_id:
+                    self._snapshots.pop(day, None)
+                    self._remove(self._path(day))
+            self._days_by_comic.pop(comic_id, None)
+            self._remove(self._index_path(comic_id))
+
+    def _remove(self, path: str) -> None:
+        if not self.directory:
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _write(self, snapshot: ComicSnapshot) -> int:
+        """Atomically replace the snapshot file; returns its modification time"""
+        if not self.directory or not self._replace(self._path(snapshot.date), snapshot.body):
+            return 0
+        return self._mtime(snapshot.date)
+
+    def _replace(self, path: str, content: bytes) -> bool:
+        """Atomically replace a file in the snapshot directory; False if that failed"""
+        if not self.directory:
+            return False
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            return True
+        except OSError as e:
+            # Memory still holds the snapshot; only restarts lose it
+            logger.warning("Failed to write %s: %s", path, e)
+            return False
+
+@lru_cache()
+def get_snapshot_service() -> SnapshotService:
+    """Returns the process-wide snapshot store (cached)"""
+    service = SnapshotService(os.environ.get("COMIC_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR))
+    # A snapshot embeds the panels; rebuild it on the next read after they change
+    on_panels_changed(service.discard_comic)
+    return service
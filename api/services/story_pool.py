@@ -0,0 +1,165 @@
+import os
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Optional, Set
+from supabase import Client
+from db.executor import run_query
+from db.supabase_client import get_supabase_client
+from models.story import Story
+from api.metrics import STORY_POOL_CLAIMS, STORY_POOL_GENERATIONS, STORY_POOL_SIZE, time_stage
+from api.services.story_service import StoryService
+
+logger = logging.getLogger(__name__)
+
+class StoryPool:
+    """Pre-generated stories kept ready for POST /stories/generate
+
+    Every story is generated from the same fixed prompt, so they are
+    interchangeable and can be produced ahead of time. A replenisher task
+    keeps up to ``size`` of them in the story_pool table; a request claims
+    one with the claim_pooled_story RPC, which moves it into the story table
+    atomically, and wakes the replenisher to generate its replacement.
+
+    Refills run at most ``refill_concurrency`` assistant runs at a time and
+    start at most ``max_per_minute`` of them, backing off after failures.
+    The pool lives in the database, so it is shared by every server worker;
+    each worker runs its own replenisher, which can overshoot the size by
+    the generations other workers have in flight.
+    """
+
+    # Longest pause after repeated generation failures, in seconds
+    MAX_BACKOFF = 300.0
+
+    def __init__(self, size: int, refill_concurrency: int = 2, max_per_minute: float = 6, check_interval: float = 60):
+        self.size = size
+        self.refill_concurrency = max(1, refill_concurrency)
+        self.min_interval = 60 / max_per_minute if max_per_minute > 0 else 0.0
+        self.check_interval = check_interval
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._generating: Set[asyncio.Task] = set()
+        self._next_start = 0.0
+        self._failures = 0
+        self._stopping = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    async def start(self) -> None:
+        """Start the replenisher on the running event loop"""
+        if not self.enabled or self._task:
+            return
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the replenisher and any generations in flight"""
+        # Also ends the replenisher if a wake-up races with the cancellation
+        self._stopping = True
+        self.refill()
+        tasks = list(self._generating) + ([self._task] if self._task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._generating.clear()
+
+    def refill(self) -> None:
+        """Ask the replenisher to top the pool up now"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def claim(self, supabase: Client) -> Optional[Story]:
+        """Publish a pooled story, or None when the pool is empty or unavailable"""
+        if not self.enabled:
+            return None
+        try:
+            response = await run_query(supabase.rpc("claim_pooled_story", {}))
+        except Exception as e:
+            STORY_POOL_CLAIMS.labels("error").inc()
+            logger.warning("Failed to claim a pooled story: %s", e)
+            return None
+        finally:
+            self.refill()
+
+        if not response.data:
+            STORY_POOL_CLAIMS.labels("empty").inc()
+            return None
+        STORY_POOL_CLAIMS.labels("hit").inc()
+        story = response.data[0]
+        StoryService.story_published(story)
+        return story
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await self._fill()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Story pool refill failed")
+            # asyncio.wait, unlike wait_for, never swallows a cancellation
+            # that arrives as the event is set
+            waiter = asyncio.ensure_future(self._wake.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=self.check_interval)
+            finally:
+                waiter.cancel()
+            self._wake.clear()
+
+    async def _fill(self) -> None:
+        supabase = get_supabase_client()
+        while not self._stopping and await self._missing(supabase) > 0:
+            await self._throttle()
+            # Count again: stories may have been added while throttled
+            if self._stopping or await self._missing(supabase) <= 0:
+                return
+            task = asyncio.create_task(self._generate(supabase))
+            self._generating.add(task)
+            task.add_done_callback(self._generating.discard)
+
+    async def _missing(self, supabase: Client) -> int:
+        """Generations that may start now without overfilling the pool"""
+        response = await run_query(supabase.table("story_pool").select("id", count="exact").limit(1))
+        pooled = response.count or 0
+        STORY_POOL_SIZE.set(pooled)
+        return min(self.size - pooled, self.refill_concurrency) - len(self._generating)
+
+    async def _throttle(self) -> None:
+        """Wait until another generation may start under the rate limit"""
+        loop = asyncio.get_running_loop()
+        delay = self._next_start - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._next_start = max(self._next_start, loop.time()) + self.min_interval
+
+    async def _generate(self, supabase: Client) -> None:
+        try:
+            with time_stage("story", "pool"):
+                story_data = await StoryService().compose_story()
+            await run_query(supabase.table("story_pool").insert(story_data, returning="minimal"))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._failures += 1
+            backoff = min(self.MAX_BACKOFF, 5 * 2 ** self._failures)
+            self._next_start = max(self._next_start, asyncio.get_running_loop().time() + backoff)
+            STORY_POOL_GENERATIONS.labels("error").inc()
+            logger.warning("Story pool generation failed, pausing refills for %.0fs: %s", backoff, e)
+        else:
+            self._failures = 0
+            STORY_POOL_GENERATIONS.labels("ok").inc()
+        self.refill()
+
+@lru_cache()
+def get_story_pool() -> StoryPool:
+    """Returns the process-wide StoryPool instance (cached)"""
+    return StoryPool(
+        size=int(os.environ.get("STORY_POOL_SIZE", 0)),
+        refill_concurrency=int(os.environ.get("STORY_POOL_REFILL_CONCURRENCY", 2)),
+        max_per_minute=float(os.environ.get("STORY_POOL_MAX_PER_MINUTE", 6)),
+        check_interval=float(os.environ.get("STORY_POOL_CHECK_INTERVAL", 60))
+    )
@@ -1,90 +1,269 @@
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 from fastapi import HTTPException
 from supabase import Client
-from models.story import Story, StoryCreate, StoryList, StoryBrief
-from api.integrations.openai_integration import generate_story
+from db.cache import get_cache
+from db.executor import run_query
+from db.pagination import apply_keyset, split_page
+from db.exceptions.database import ValidationError
+from models.story import Story, StoryCreate, StoryList, StoryBrief, StoryResponse
+from api.http_cache import RenderedModel
+from api.integrations.openai_integration import request_story, generate_story_assistant, stream_story_chat
+from api.metrics import time_stage
 import math
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
 
 class StoryService:
     # Fixed prompt for story generation
     STORY_PROMPT = """Write a story in 7 sentences. The first sentence is the title of the story (not in quotes). The story must be written as one single paragraph. Use simple words that children can understand. The story should be about two strangers who meet in a very specific and unusual place (for example: a parking lot during a balloon festival, a library during a fire drill, or a zoo on a rainy Monday). Something small but surprising should happen — maybe they share a snack, help each other, or make a funny mistake. The story should end with a feeling — either happy, sad, or inspired — and should never repeat the same characters, place, or surprise."""
 
+    # Keyset order for listings, served by the story_created_at_id_idx index
+    LIST_ORDER = ("created_at", "id")
+    
+    # Deepest offset reachable by page number; deeper pages need a cursor
+    MAX_PAGE_OFFSET = 1000
+    
+    # Columns returned for story listings and detail reads
+    BRIEF_COLUMNS = "id, title, created_at"
+    DETAIL_COLUMNS = "id, title, story, created_at"
+    
+    # Listing totals are reused for this many seconds
+    COUNT_TTL = float(os.environ.get("STORY_COUNT_TTL", 60))
+    _cached_total: Optional[Tuple[float, int]] = None
+
+    async def compose_story(self) -> Dict[str, str]:
+        """Generate a story with OpenAI, shaped as a story row (title and text)
+        
+        Raises when OpenAI fails or does not return the title and 6 sentences,
+        so no placeholder story is ever stored.
+        """
+        # Generate story using the fixed prompt
+        title, sentences = await request_story(self.STORY_PROMPT)
+        if len(sentences) != 7:
+            raise ValueError(f"Expected a title and 6 sentences, got {len(sentences)} sentences")
+        
+        # Remove any quotes from the title
+        title = title.strip('"').strip()
+        
+        # Join the remaining sentences into the story text
+        story_text = ". ".join(sentences[1:])
+        if not story_text.endswith('.'):
+            story_text += "."
+        
+        return {
+            "title": title,
+            "story": story_text
+        }
+
     async def generate_and_save_story(self, prompt: str, supabase: Client) -> Story:
         """Generate a story using OpenAI and save it to the database"""
         try:
-            # Generate story using the fixed prompt
-            title, sentences = generate_story(self.STORY_PROMPT)
-            
-            # Remove any quotes from the title
-            title = title.strip('"').strip()
-            
-            # Join the remaining sentences into the story text
-            story_text = ". ".join(sentences[1:])
-            if not story_text.endswith('.'):
-                story_text += "."
-            
-            # Prepare story data
-            story_data = {
-                "title": title,
-                "story": story_text
-            }
-            
-            # Save to database
-            response = supabase.table("story").insert(story_data).execute()
-            
-            if hasattr(response, 'error') and response.error:
-                raise HTTPException(status_code=500, detail=f"Supabase error: {response.error.message}")
-            
-            return response.data[0]
+            with time_stage("story", "story"):
+                story_data = await self.compose_story()
+            return await self.save_story(story_data, supabase)
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to generate and save story: {str(e)}")
 
+    async def save_story(self, story_data: Dict[str, str], supabase: Client) -> Story:
+        """Insert a generated story and return the stored record"""
+        with time_stage("story", "save"):
+            response = await run_query(supabase.table("story").insert(story_data))
+        
+        if hasattr(response, 'error') and response.error:
+            raise HTTPException(status_code=500, detail=f"Supabase error: {response.error.message}")
+        
+        story = response.data[0]
+        self.story_published(story)
+        return story
+
+    async def stream_and_save_story(self, supabase: Client) -> AsyncIterator[Tuple[str, Any]]:
+        """Generate a story, yielding ("title", str) and ("sentence", str) as
+        the model writes them, then save it and yield ("story", record)
+        
+        The story is streamed from Chat Completions whatever STORY_BACKEND is.
+        If that fails before anything was sent, the story comes from the
+        assistant instead and is sent in one go.
+        """
+        title, sentences = "", []
+        try:
+            with time_stage("story", "story"):
+                async for kind, text in stream_story_chat(self.STORY_PROMPT):
+                    if kind == "title":
+                        title = text.strip('"').strip()
+                        yield "title", title
+                    else:
+                        sentences.append(text)
+                        yield "sentence", text
+        except Exception as e:
+            if title or sentences:
+                raise HTTPException(status_code=502, detail=f"Story generation stopped: {str(e)}")
+            logger.warning("Streamed story generation failed, falling back to the assistant: %s", e)
+            with time_stage("story", "story"):
+                title, sentences = await generate_story_assistant(self.STORY_PROMPT)
+            title, sentences = title.strip('"').strip(), sentences[1:]
+            yield "title", title
+            for sentence in sentences:
+                yield "sentence", sentence
+        
+        yield "story", await self.save_story({"title": title, "story": ". ".join(sentences) + "."}, supabase)
+
+    async def replay_story(self, story: Story) -> AsyncIterator[Tuple[str, Any]]:
+        """The events of stream_and_save_story for an already stored story"""
+        yield "title", story["title"]
+        for sentence in story["story"].split("."):
+            if sentence.strip():
+                yield "sentence", sentence.strip()
+        yield "story", story
+
+    @classmethod
+    def story_published(cls, story: Story) -> None:
+        """Drop cached reads that a newly published story makes stale"""
+        # The cached listing total no longer includes every story
+        cls._cached_total = None
+        get_cache("story").invalidate(("row", story["id"]), ("rendered", story["id"]))
+
     async def list_stories(
         self, 
         page: int, 
         page_size: int, 
         search: Optional[str],
-        supabase: Client
+        supabase: Client,
+        cursor: Optional[str] = None,
+        fields: str = "all"
     ) -> StoryList:
-        """List stories with pagination and search"""
+        """List stories with pagination and search
+        
+        Without a cursor, pages are addressed by number (limited to shallow
+        offsets). With a cursor from a previous next_cursor, the listing
+        resumes by keyset instead of OFFSET. Totals come from an estimated
+        count that is cached for COUNT_TTL seconds.
+        
+        A search runs the ranked full-text search_stories RPC over the
+        requested fields ("all", "title" or "story") and is paged by number.
+        Only the newest 1100 matches (MAX_PAGE_OFFSET plus the largest page)
+        are ranked, which keeps common terms fast; older matches are not
+        returned.
+        """
         try:
-            # Start building the query
-            query = supabase.table("story").select("id, title, created_at", count="exact")
-            
-            # Add search if provided
             if search:
-                query = query.ilike("title", f"%{search}%")
+                return await self._search_stories(page, page_size, search, fields, supabase)
+            
+            cached_total = self._cached_count()
+            count = None if cursor or cached_total is not None else "estimated"
+            
+            # Start building the query
+            query = supabase.table("story").select(self.BRIEF_COLUMNS, count=count)
             
             # Add pagination
-            start = (page - 1) * page_size
-            query = query.range(start, start + page_size - 1).order("created_at", desc=True)
+            if cursor:
+                try:
+                    query = apply_keyset(query, self.LIST_ORDER, page_size, cursor, desc=True)
+                except ValidationError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+            else:
+                start = self._page_offset(page, page_size)
+                # range() excludes its end; the extra row tells us if another page exists
+                query = query.order("created_at.desc,id.desc").range(start, start + page_size + 1)
             
             # Execute query
-            response = query.execute()
+            response = await run_query(query)
             
             if hasattr(response, 'error') and response.error:
                 raise HTTPException(status_code=500, detail=f"Supabase error: {response.error.message}")
             
+            items, next_cursor = split_page(response.data, self.LIST_ORDER, page_size)
+            
             # Calculate pagination info
-            total = response.count
-            total_pages = math.ceil(total / page_size)
+            total = cached_total
+            if response.count is not None:
+                total = response.count
+                self._store_count(total)
+            total_pages = math.ceil(total / page_size) if total is not None else None
             
             return StoryList(
-                items=response.data,
+                items=items,
                 total=total,
-                page=page,
+                page=None if cursor else page,
                 page_size=page_size,
-                total_pages=total_pages
+                total_pages=total_pages,
+                next_cursor=next_cursor
             )
             
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to list stories: {str(e)}")
 
-    async def get_story_by_id(self, story_id: int, supabase: Client) -> Story:
-        """Get a story by ID"""
+    async def _search_stories(
+        self,
+        page: int,
+        page_size: int,
+        search: str,
+        fields: str,
+        supabase: Client
+    ) -> StoryList:
+        """Ranked full-text search, best matches first"""
+        start = self._page_offset(page, page_size)
+        response = await run_query(supabase.rpc("search_stories", {
+            "search_query": search,
+            "search_fields": fields,
+            "result_limit": page_size + 1,
+            "result_offset": start
+        }), shared=True)  # read-only, so identical searches in flight share it
+        
+        if hasattr(response, 'error') and response.error:
+            raise HTTPException(status_code=500, detail=f"Supabase error: {response.error.message}")
+        
+        # The total is only known once the last page has been reached
+        items = response.data[:page_size]
+        total = start + len(items) if len(response.data) <= page_size else None
+        
+        return StoryList(
+            items=items,
+            total=total,
+            page=page,
+            page_size=page_size,
+            total_pages=math.ceil(total / page_size) if total is not None else None
+        )
+
+    def _page_offset(self, page: int, page_size: int) -> int:
+        """Row offset of a page number, rejecting pages that are too deep"""
+        start = (page - 1) * page_size
+        if start > self.MAX_PAGE_OFFSET:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Pages beyond {self.MAX_PAGE_OFFSET} stories are only available through next_cursor"
+            )
+        return start
+
+    @classmethod
+    def _cached_count(cls) -> Optional[int]:
+        entry = cls._cached_total
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    @classmethod
+    def _store_count(cls, total: int) -> None:
+        cls._cached_total = (time.monotonic() + cls.COUNT_TTL, total)
+
+    async def get_story_by_id(self, story_id: int, supabase: Client) -> RenderedModel:
+        """Get a story by ID, pre-rendered, served from the in-process cache when possible"""
+        return await get_cache("story").get_or_load(
+            ("rendered", story_id),
+            lambda: self._load_story(story_id, supabase)
+        )
+
+    async def _load_story(self, story_id: int, supabase: Client) -> RenderedModel:
+        return RenderedModel(StoryResponse.model_validate(await self._fetch_story(story_id, supabase)))
+
+    async def _fetch_story(self, story_id: int, supabase: Client) -> Dict[str, Any]:
         try:
-            response = supabase.table("story").select("*").eq("id", story_id).execute()
+            response = await run_query(supabase.table("story").select(self.DETAIL_COLUMNS).eq("id", story_id))
             
             if hasattr(response, 'error') and response.error:
                 raise HTTPException(status_code=500, detail=f"Supabase error: {response.error.message}")
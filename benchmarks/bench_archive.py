@@ -0,0 +1,70 @@
+"""Archive export and import throughput
+
+Seeds the fake PostgREST server with ``--comics`` comics (six panels each)
+and their stories, exports them through GET /export, imports the export into
+an emptied database with ArchiveImporter, and checks that every table comes
+back unchanged. ``--latency`` is added to every database request.
+
+    python -m benchmarks.bench_archive --comics 2000 --batch-size 1000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.common import app_client, use_fake_supabase
+from benchmarks.fake_postgrest import FakePostgrestServer
+
+TABLES = ("story", "comics", "panels")
+
+
+async def run(args: argparse.Namespace) -> None:
+    with FakePostgrestServer() as server:
+        server.db.latency["*"] = args.latency
+        server.db.seed(stories=args.comics, comics=args.comics)
+        use_fake_supabase(server.url)
+        from db.archive import ARCHIVE_TABLES, ArchiveImporter
+        from db.supabase_client import get_supabase_client
+
+        before = {table: [dict(row) for row in server.db.tables[table]] for table in TABLES}
+        rows = sum(len(before[table]) for table in TABLES)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "archive.ndjson")
+            async with app_client() as client:
+                started = time.perf_counter()
+                async with client.stream("GET", "/export", params={"page_size": args.page_size}) as response:
+                    response.raise_for_status()
+                    with open(path, "wb") as f:
+                        async for chunk in response.aiter_bytes():
+                            f.write(chunk)
+                elapsed = time.perf_counter() - started
+            print(f"export   {rows} rows in {elapsed:.2f}s  {rows / elapsed:8.0f} rows/s  ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+            for table in TABLES:
+                server.db.tables[table] = []
+            importer = ArchiveImporter(get_supabase_client(), args.batch_size, os.path.join(directory, "checkpoint"))
+            with open(path, "rb") as f:
+                result = await importer.run(f)
+            print(f"import   {rows} rows in {result['seconds']:.2f}s  {result['rows_per_second']:8.0f} rows/s  (batch size {args.batch_size})")
+
+        for table in TABLES:
+            columns = [column.strip() for column in ARCHIVE_TABLES[table].split(",")]
+            project = lambda rows: sorted(({column: row.get(column) for column in columns} for row in rows), key=lambda row: row["id"])
+            if project(server.db.tables[table]) != project(before[table]):
+                raise RuntimeError(f"{table} differs after the round trip")
+        print("round trip ok")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--comics", type=int, default=2000, help="Comics to seed (each with a story and six panels)")
+    parser.add_argument("--page-size", type=int, default=500, help="Rows read per export request")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows written per import request")
+    parser.add_argument("--latency", type=float, default=0.002, help="Seconds added to every database request")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
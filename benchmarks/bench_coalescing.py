@@ -0,0 +1,66 @@
+"""Database calls made by a burst of identical requests, with and without
+single-flight coalescing of Supabase reads
+
+Sends ``--requests`` concurrent requests for the same story listing, story
+and comic (with the read caches emptied first, as right after a publish)
+and counts the PostgREST calls each burst causes.
+
+    python -m benchmarks.bench_coalescing --requests 500 --latency 0.05
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import app_client, format_summary, summarize, use_fake_supabase
+from benchmarks.fake_postgrest import FakePostgrestServer
+
+PATHS = ("/stories/?page=1&page_size=20", "/stories/1", "/comics/1", "/stories/?search=snack")
+
+
+async def burst(client, path: str, requests: int):
+    latencies = []
+
+    async def one() -> None:
+        started = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies
+
+
+async def run(args: argparse.Namespace) -> None:
+    with FakePostgrestServer() as server:
+        server.db.latency["*"] = args.latency
+        server.db.seed(stories=200, comics=50)
+        use_fake_supabase(server.url)
+        from db import executor
+        from db.cache import get_cache
+        from api.services.story_service import StoryService
+
+        async with app_client() as client:
+            await client.get("/health")
+            for enabled in (False, True):
+                executor.SINGLE_FLIGHT = enabled
+                for path in PATHS:
+                    for name in ("comics", "story"):
+                        get_cache(name).clear()
+                    StoryService._cached_total = None
+                    before = server.db.request_count
+                    latencies = await burst(client, path, args.requests)
+                    calls = server.db.request_count - before
+                    label = f"{'coalesced' if enabled else 'separate'} {path}"
+                    print(f"{format_summary(label, summarize(latencies))} db calls={calls}")
+            print(executor.get_read_flights().stats())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500, help="Concurrent identical requests per burst")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every database request")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
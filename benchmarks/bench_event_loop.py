@@ -0,0 +1,70 @@
+"""Event-loop responsiveness under slow Supabase calls
+
+Measures ``GET /stories/{id}`` latency on its own and again while a batch of
+``GET /comics/`` requests is stuck on a slow ``comics`` table. The story
+cache is disabled so every probe makes its own Supabase call. With the
+Supabase executor in place the two p99 figures should be close; with
+blocking ``execute()`` calls every probe waits behind the slow queries.
+
+    python -m benchmarks.bench_event_loop --slow-requests 8 --slow-latency 0.5
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from benchmarks.common import app_client, format_summary, summarize, use_fake_supabase
+from benchmarks.fake_postgrest import FakePostgrestServer
+
+
+async def probe_stories(client, probes: int, story_ids: List[int]) -> List[float]:
+    latencies = []
+    for i in range(probes):
+        started = time.perf_counter()
+        response = await client.get(f"/stories/{story_ids[i % len(story_ids)]}")
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+    return latencies
+
+
+async def slow_listing(client, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        await client.get("/comics/")
+
+
+async def run(args: argparse.Namespace) -> None:
+    with FakePostgrestServer() as server:
+        server.db.seed(stories=100, comics=20)
+        server.db.latency = {"story": args.fast_latency, "comics": args.slow_latency}
+        use_fake_supabase(server.url)
+        # Every probe must reach Supabase; cache hits would never wait on the loop
+        from db.cache import get_cache
+        get_cache("story").max_entries = 0
+        story_ids = [row["id"] for row in server.db.tables["story"]]
+
+        async with app_client() as client:
+            await probe_stories(client, 5, story_ids)  # warm up the connection pool
+            idle = await probe_stories(client, args.probes, story_ids)
+
+            stop = asyncio.Event()
+            background = [asyncio.create_task(slow_listing(client, stop)) for _ in range(args.slow_requests)]
+            await asyncio.sleep(args.slow_latency / 2)
+            loaded = await probe_stories(client, args.probes, story_ids)
+            stop.set()
+            await asyncio.gather(*background)
+
+    print(format_summary("GET /stories/{id} idle", summarize(idle)))
+    print(format_summary("GET /stories/{id} under load", summarize(loaded)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--probes", type=int, default=200, help="Story requests per phase")
+    parser.add_argument("--slow-requests", type=int, default=8, help="Concurrent slow comic listings")
+    parser.add_argument("--slow-latency", type=float, default=0.5, help="Seconds per comics query")
+    parser.add_argument("--fast-latency", type=float, default=0.002, help="Seconds per story query")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Panel image rendering: sequential versus bounded-concurrent
+
+Renders a six-panel comic against a fake image endpoint and compares the
+wall time with a single image call. With concurrency at or above the panel
+count the comic should take about as long as one image.
+
+    python -m benchmarks.bench_panels --latency 0.5 --fail-every 6
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import use_fake_openai
+from benchmarks.fake_openai import FakeOpenAIServer
+
+SENTENCES = [f"Panel sentence number {i}" for i in range(1, 7)]
+
+
+async def run(args: argparse.Namespace) -> None:
+    with FakeOpenAIServer() as server:
+        server.state.image_latency = args.latency
+        use_fake_openai(server.url)
+        from api.integrations.openai_integration import generate_comic_panels, generate_image
+
+        await generate_image("warm up")
+        server.state.image_failure_every = args.fail_every
+
+        started = time.perf_counter()
+        await generate_image(SENTENCES[0])
+        single = time.perf_counter() - started
+        print(f"{'single image':<28} {single * 1000:8.1f}ms")
+
+        for concurrency in sorted({1, 3, args.concurrency}):
+            started = time.perf_counter()
+            panels = await generate_comic_panels(SENTENCES, concurrency=concurrency, timeout=args.timeout)
+            elapsed = time.perf_counter() - started
+            rendered = sum(1 for panel in panels if panel["image_url"])
+            print(
+                f"{f'6 panels, concurrency={concurrency}':<28} {elapsed * 1000:8.1f}ms "
+                f"({elapsed / single:4.1f}x single, {rendered}/6 images)"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per fake image call")
+    parser.add_argument("--concurrency", type=int, default=6, help="Concurrency cap to compare")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Per-image timeout in seconds")
+    parser.add_argument("--fail-every", type=int, default=0, help="Fail every Nth image request")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Story search latency on a seeded local Supabase stack
+
+Index behaviour cannot be reproduced by the in-memory fake, so this benchmark
+runs against a real Postgres/PostgREST pair started with ``supabase start``
+and the migrations applied (``supabase db reset``). It seeds the ``story``
+table up to ``--stories`` rows, then times the ranked ``search_stories`` RPC
+against the previous ``ilike '%term%'`` title filter.
+
+    export SUPABASE_URL=http://127.0.0.1:54321
+    export SUPABASE_KEY=<service_role key from `supabase status`>
+    python -m benchmarks.bench_search --stories 100000
+"""
+import argparse
+import os
+import random
+import time
+from typing import Callable, List
+
+from benchmarks.common import format_summary, summarize
+
+WORDS = (
+    "balloon festival library fire drill zoo rainy monday parking lot snack umbrella "
+    "kite bakery robot garden lighthouse penguin bicycle museum train station puppy "
+    "dragon pancake orchestra volcano treasure map astronaut carnival pirate owl "
+    "sandcastle rainbow moonlight tractor village circus acorn meadow lantern"
+).split()
+
+TERMS = ["balloon", "lighthouse penguin", "rainy monday", "treasure", "volcano astronaut", "zebra"]
+
+
+def make_story(rng: random.Random) -> dict:
+    sentences = [" ".join(rng.choices(WORDS, k=rng.randint(6, 12))).capitalize() + "." for _ in range(6)]
+    return {"title": " ".join(rng.choices(WORDS, k=3)).title(), "story": " ".join(sentences)}
+
+
+def seed(supabase, target: int, batch_size: int) -> None:
+    existing = supabase.table("story").select("id", count="exact").limit(1).execute().count or 0
+    rng = random.Random(42)
+    remaining = target - existing
+    started = time.perf_counter()
+    while remaining > 0:
+        batch = [make_story(rng) for _ in range(min(batch_size, remaining))]
+        supabase.table("story").insert(batch, returning="minimal").execute()
+        remaining -= len(batch)
+    if target > existing:
+        print(f"seeded {target - existing} stories in {time.perf_counter() - started:.1f}s")
+    print(f"story table holds {max(existing, target)} rows")
+
+
+def measure(call: Callable[[str], object], repetitions: int) -> List[float]:
+    latencies = []
+    for _ in range(repetitions):
+        for term in TERMS:
+            started = time.perf_counter()
+            call(term)
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stories", type=int, default=100_000, help="Rows to seed the story table up to")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per seeding insert")
+    parser.add_argument("--repetitions", type=int, default=20, help="Passes over the search terms")
+    args = parser.parse_args()
+
+    from supabase import create_client
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    seed(supabase, args.stories, args.batch_size)
+
+    def ranked(term: str) -> object:
+        return supabase.rpc("search_stories", {"search_query": term, "search_fields": "all", "result_limit": 11}).execute()
+
+    def ranked_titles(term: str) -> object:
+        return supabase.rpc("search_stories", {"search_query": term, "search_fields": "title", "result_limit": 11}).execute()
+
+    def legacy(term: str) -> object:
+        return supabase.table("story").select("id, title, created_at").ilike("title", f"%{term}%").order("created_at", desc=True).limit(11).execute()
+
+    for name, call in [("search_stories (all fields)", ranked), ("search_stories (title)", ranked_titles), ("ilike on title (before)", legacy)]:
+        measure(call, 1)  # warm caches
+        print(format_summary(name, summarize(measure(call, args.repetitions))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Response serialization cost per 1,000 comics and stories
+
+Compares the previous response path, where FastAPI validates the listing
+against the route's response_model, encodes it with json.dumps and the ETag
+is computed through jsonable_encoder, with the current one, where the model
+is validated once and pydantic-core renders both the body and the ETag input.
+
+    python -m benchmarks.bench_serialization --items 1000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+import benchmarks.common  # noqa: F401  (puts the project root on sys.path)
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api.http_cache import compute_etag, model_response
+from models.comic import ComicList
+from models.story import StoryList
+
+
+def comic_rows(count: int) -> List[Dict[str, Any]]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": i,
+            "date": (start + timedelta(days=i)).date().isoformat(),
+            "title": f"Comic {i}",
+            "story_id": i,
+            "panels": [
+                {
+                    "id": i * 10 + order,
+                    "comic_id": i,
+                    "sentence": f"Sentence {order} of comic {i}, where two strangers share a snack",
+                    "image_url": f"https://images.example.com/{i}/{order}.png",
+                    "panel_order": order,
+                }
+                for order in range(1, 7)
+            ],
+            "story": {
+                "id": i,
+                "title": f"Comic {i}",
+                "story": "Two strangers meet at a balloon festival. They share a snack. " * 4,
+                "created_at": (start + timedelta(days=i)).isoformat(),
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def story_rows(count: int) -> List[Dict[str, Any]]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [{"id": i, "title": f"Story {i}", "created_at": (start + timedelta(minutes=i)).isoformat()} for i in range(count)]
+
+
+def legacy_etag(payload: Any) -> str:
+    """ETag input as it was computed before models were rendered directly"""
+    return json.dumps(jsonable_encoder(payload, exclude_unset=True), sort_keys=True, separators=(",", ":"), default=str)
+
+
+async def measure(call: Callable[[], Awaitable[Any]], repeat: int) -> float:
+    """Best time of `repeat` runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+async def run(args: argparse.Namespace) -> None:
+    listings = {
+        "comics": (ComicList, lambda: ComicList(items=comic_rows(args.items), limit=args.items)),
+        "stories": (StoryList, lambda: StoryList(items=story_rows(args.items), page_size=args.items)),
+    }
+    for name, (model, build) in listings.items():
+        field = create_response_field(name="Response", type_=model)
+        listing = build()
+
+        async def before() -> None:
+            legacy_etag(listing)
+            content = await serialize_response(field=field, response_content=listing)
+            JSONResponse(content)
+
+        async def orjson_only() -> None:
+            legacy_etag(listing)
+            content = await serialize_response(field=field, response_content=listing)
+            ORJSONResponse(content)
+
+        async def after() -> None:
+            compute_etag(listing)
+            model_response(listing)
+
+        async def validate() -> None:
+            build()
+
+        scale = 1000 / args.items
+        results = [
+            ("validate rows into models", await measure(validate, args.repeat)),
+            ("before: response_model + json", await measure(before, args.repeat)),
+            ("before, with ORJSONResponse", await measure(orjson_only, args.repeat)),
+            ("after: render validated model", await measure(after, args.repeat)),
+        ]
+        for label, elapsed in results:
+            print(f"{name:<8} {label:<32} {elapsed * scale:8.2f}ms per 1,000")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000, help="Items per listing")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement; the best is reported")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
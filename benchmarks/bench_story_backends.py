@@ -0,0 +1,74 @@
+"""Story generation latency: Assistants run versus one Chat Completions call
+
+Both fakes take ``--model-time`` seconds to produce a story and add
+``--request-latency`` to every API call, so the difference is the
+Assistants flow's extra round trips (thread, message, run, polls, message
+list) and the time a finished run waits for the next poll.
+
+    python -m benchmarks.bench_story_backends --model-time 3 --request-latency 0.15
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from benchmarks.common import format_summary, summarize, use_fake_openai
+from benchmarks.fake_openai import FakeOpenAIServer
+
+
+async def measure(generate, stories: int, concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            title, sentences = await generate()
+            latencies.append(time.perf_counter() - started)
+            if len(sentences) != 7:
+                raise RuntimeError(f"expected 7 sentences, got {len(sentences)}")
+
+    await asyncio.gather(*(one() for _ in range(stories)))
+    return latencies
+
+
+async def run(args: argparse.Namespace) -> None:
+    with FakeOpenAIServer() as server:
+        server.state.request_latency = args.request_latency
+        server.state.run_duration = args.model_time
+        server.state.chat_latency = args.model_time
+        use_fake_openai(server.url)
+        from api.integrations import openai_integration as oi
+
+        backends = {
+            "assistants": lambda: oi.generate_story_assistant("Write a story"),
+            "chat": lambda: oi.generate_story_chat("Write a story", stream=False),
+            "chat (streamed)": lambda: oi.generate_story_chat("Write a story", stream=True),
+        }
+        for name, generate in backends.items():
+            await generate()  # warm up the connection
+            before = dict(server.state.calls)
+            latencies = await measure(generate, args.stories, args.concurrency)
+            calls = sum(server.state.calls.values()) - sum(before.values())
+            print(f"{format_summary(name, summarize(latencies))} calls/story={calls / args.stories:.1f}")
+
+        if args.chat_fail_every:
+            # Chat failures fall back to the assistant through request_story
+            server.state.chat_failure_every = args.chat_fail_every
+            oi.STORY_BACKEND = "chat"
+            latencies = await measure(lambda: oi.request_story("Write a story"), args.stories, args.concurrency)
+            print(format_summary(f"chat, 1/{args.chat_fail_every} fallback", summarize(latencies)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stories", type=int, default=10, help="Stories per backend")
+    parser.add_argument("--concurrency", type=int, default=5, help="Stories generated at once")
+    parser.add_argument("--model-time", type=float, default=3.0, help="Seconds the model takes per story")
+    parser.add_argument("--request-latency", type=float, default=0.15, help="Seconds added to every API call")
+    parser.add_argument("--chat-fail-every", type=int, default=0, help="Also measure with every Nth chat call failing")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
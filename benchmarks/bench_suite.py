@@ -0,0 +1,247 @@
+"""Offline scenario suite with a stored baseline
+
+Drives ``api.main`` in-process against the fake PostgREST and OpenAI
+servers through the main user journeys and reports throughput, latency
+percentiles and memory for each:
+
+- list_stories: paged ``GET /stories/``
+- search_stories: ranked ``GET /stories/?search=...``
+- fetch_comic: ``GET /comics/{id}`` across the seeded archive
+- generate_comic: ``POST /comics/generate`` (assistant run plus six images)
+- mixed: concurrent blend of the above, mostly reads
+
+Results are compared with ``benchmarks/baseline.json``; a scenario whose
+throughput drops or whose p95/p99 grows by more than ``--tolerance`` is
+reported as a regression and the exit status is 1. The default tolerance
+is loose because tail latency on a shared box varies by a third between
+runs; it still catches the extra round trips or lost caching that double a
+figure. Record a new baseline on the machine that runs the comparison:
+
+    python -m benchmarks.bench_suite --save-baseline
+    python -m benchmarks.bench_suite --scenarios list_stories fetch_comic
+
+The fake servers run in this process, so memory and CPU figures include
+them; compare runs made with the same settings only.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from benchmarks.common import app_client, percentile, project_root, use_fake_openai, use_fake_supabase
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.fake_postgrest import FakePostgrestServer
+
+DEFAULT_BASELINE = os.path.join(project_root, "benchmarks", "baseline.json")
+
+SEARCH_TERMS = ["strangers", "snack", "place 7", "smiles", "place 42 snack", "volcano"]
+
+# Figures below this many milliseconds are treated as noise when comparing
+LATENCY_FLOOR_MS = 1.0
+
+Request = Callable[[Any, random.Random], Awaitable[Any]]
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MiB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+    except OSError:
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+class Scenario:
+    """A named request mix run a fixed number of times at a fixed concurrency"""
+
+    def __init__(self, name: str, requests: int, concurrency: int, weighted: List[tuple]):
+        self.name = name
+        self.requests = requests
+        self.concurrency = concurrency
+        self.choices = [request for request, _ in weighted]
+        self.weights = [weight for _, weight in weighted]
+
+    def pick(self, rng: random.Random) -> Request:
+        return rng.choices(self.choices, self.weights)[0]
+
+
+def build_scenarios(story_ids: List[int], comic_ids: List[int], scale: float) -> List[Scenario]:
+    async def list_stories(client, rng):
+        return await client.get("/stories/", params={"page": rng.randint(1, 5), "page_size": 10})
+
+    async def search_stories(client, rng):
+        return await client.get("/stories/", params={"search": rng.choice(SEARCH_TERMS)})
+
+    async def story_detail(client, rng):
+        return await client.get(f"/stories/{rng.choice(story_ids)}")
+
+    async def fetch_comic(client, rng):
+        return await client.get(f"/comics/{rng.choice(comic_ids)}")
+
+    async def generate_comic(client, rng):
+        return await client.post("/comics/generate")
+
+    def count(n: int) -> int:
+        return max(1, int(n * scale))
+
+    return [
+        Scenario("list_stories", count(2000), 16, [(list_stories, 1)]),
+        Scenario("search_stories", count(1000), 16, [(search_stories, 1)]),
+        Scenario("fetch_comic", count(2000), 16, [(fetch_comic, 1)]),
+        Scenario("generate_comic", count(12), 4, [(generate_comic, 1)]),
+        Scenario("mixed", count(3000), 32, [
+            (list_stories, 40), (search_stories, 15), (story_detail, 10), (fetch_comic, 34), (generate_comic, 1),
+        ]),
+    ]
+
+
+async def run_scenario(client, scenario: Scenario, seed: int) -> Dict[str, float]:
+    rng = random.Random(seed)
+    plan = [scenario.pick(rng) for _ in range(scenario.requests)]
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker(worker_rng: random.Random) -> None:
+        nonlocal errors
+        while plan:
+            request = plan.pop()
+            started = time.perf_counter()
+            response = await request(client, worker_rng)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(random.Random(seed + i)) for i in range(scenario.concurrency)))
+    elapsed = time.perf_counter() - started
+    rss_after = rss_mb()
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "rss_mb": round(rss_after, 1),
+        "rss_growth_mb": round(rss_after - rss_before, 1),
+    }
+
+
+def compare(name: str, result: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """Regressions of one scenario against its baseline figures"""
+    problems = []
+    if result["rps"] < baseline["rps"] * (1 - tolerance):
+        problems.append(f"{name}: throughput {result['rps']:.1f} rps vs baseline {baseline['rps']:.1f}")
+    for key in ("p95_ms", "p99_ms"):
+        limit = max(baseline[key] * (1 + tolerance), baseline[key] + LATENCY_FLOOR_MS)
+        if result[key] > limit:
+            problems.append(f"{name}: {key[:3]} {result[key]:.2f}ms vs baseline {baseline[key]:.2f}ms")
+    if result["errors"] > baseline.get("errors", 0):
+        problems.append(f"{name}: {result['errors']} errors vs baseline {baseline.get('errors', 0)}")
+    return problems
+
+
+def format_result(name: str, result: Dict[str, float]) -> str:
+    return (
+        f"{name:<16} n={result['requests']:<6} err={result['errors']:<3} {result['rps']:9.1f} rps "
+        f"p50={result['p50_ms']:8.2f}ms p95={result['p95_ms']:8.2f}ms p99={result['p99_ms']:8.2f}ms "
+        f"rss={result['rss_mb']:6.1f}MiB (+{result['rss_growth_mb']:.1f})"
+    )
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    # Generated comics are snapshotted; keep them out of the working tree
+    os.environ["COMIC_SNAPSHOT_DIR"] = tempfile.mkdtemp(prefix="bench-snapshots-")
+    from api.services.snapshot_service import get_snapshot_service
+    get_snapshot_service.cache_clear()
+
+    results = {}
+    with FakePostgrestServer() as supabase, FakeOpenAIServer() as openai:
+        supabase.db.seed(stories=args.stories, comics=args.comics)
+        supabase.db.latency = {"*": args.db_latency}
+        openai.state.request_latency = args.openai_latency
+        openai.state.run_duration = args.run_duration
+        openai.state.image_latency = args.image_latency
+        use_fake_supabase(supabase.url)
+        use_fake_openai(openai.url)
+
+        story_ids = [row["id"] for row in supabase.db.tables["story"]]
+        comic_ids = [row["id"] for row in supabase.db.tables["comics"]]
+        scenarios = build_scenarios(story_ids, comic_ids, args.scale)
+        if args.scenarios:
+            scenarios = [scenario for scenario in scenarios if scenario.name in args.scenarios]
+
+        async with app_client() as client:
+            # Warm up the connection pools and import-time work
+            await asyncio.gather(*(client.get(f"/stories/{story_id}") for story_id in story_ids[:16]))
+            for i, scenario in enumerate(scenarios):
+                results[scenario.name] = await run_scenario(client, scenario, args.seed + i * 1000)
+                print(format_result(scenario.name, results[scenario.name]), flush=True)
+    return results
+
+
+def settings(args: argparse.Namespace) -> Dict[str, Any]:
+    """Parameters that must match for a baseline comparison to mean anything"""
+    keys = ("stories", "comics", "db_latency", "openai_latency", "run_duration", "image_latency", "scale", "seed")
+    return {key: getattr(args, key) for key in keys}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", help="Run only these scenarios")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every scenario's request count")
+    parser.add_argument("--stories", type=int, default=500, help="Seeded stories")
+    parser.add_argument("--comics", type=int, default=200, help="Seeded comics")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="Seconds per PostgREST request")
+    parser.add_argument("--openai-latency", type=float, default=0.02, help="Seconds per thread/message/run call")
+    parser.add_argument("--run-duration", type=float, default=0.5, help="Seconds until an assistant run completes")
+    parser.add_argument("--image-latency", type=float, default=0.2, help="Seconds per image call")
+    parser.add_argument("--seed", type=int, default=1, help="Request mix seed")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.4, help="Allowed relative slowdown before failing")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"settings": settings(args), "scenarios": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {os.path.relpath(args.baseline)}")
+        return
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"no baseline at {os.path.relpath(args.baseline)}; run with --save-baseline to create one")
+        return
+    if baseline.get("settings") != settings(args):
+        print("baseline was recorded with different settings; skipping comparison")
+        return
+
+    problems = []
+    for name, result in results.items():
+        if name in baseline["scenarios"]:
+            problems += compare(name, result, baseline["scenarios"][name], args.tolerance)
+    if problems:
+        print("regressions against baseline:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print(f"no regressions against baseline (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
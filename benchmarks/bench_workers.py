@@ -0,0 +1,156 @@
+"""Throughput of the production server with one worker versus several
+
+Starts a fake PostgREST, then for each worker count launches
+``python server.py`` against it and drives keep-alive HTTP load from
+separate client processes for a fixed duration, reporting requests per
+second and latency percentiles. On the 2-vCPU Lightsail box, compare
+``--workers 1 2``; throughput should roughly double when both cores serve.
+
+Load generation needs CPU too: for clean numbers run it from another host
+with ``--url http://<server>:8000`` against an already running server.
+
+    python -m benchmarks.bench_workers --workers 1 2 --duration 10
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.common import format_summary, project_root, summarize
+from benchmarks.fake_postgrest import FAKE_SUPABASE_KEY, FakeDatabase, FakePostgrestServer
+
+DEFAULT_PATHS = ["/comics/1", "/comics/today", "/stories/1", "/stories/?page=1"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _drive(url: str, paths: List[str], concurrency: int, duration: float) -> List[float]:
+    import httpx
+
+    latencies: List[float] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+
+        async def user(offset: int) -> None:
+            i = offset
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(paths[i % len(paths)])
+                if response.status_code < 500:
+                    latencies.append(time.perf_counter() - started)
+                i += 1
+
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+    return latencies
+
+
+def _client_process(args: Tuple[str, List[str], int, float]) -> List[float]:
+    return asyncio.run(_drive(*args))
+
+
+def run_load(url: str, paths: List[str], clients: int, concurrency: int, duration: float) -> Dict[str, float]:
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.map(_client_process, [(url, paths, concurrency, duration)] * clients)
+    latencies = [latency for result in results for latency in result]
+    summary = summarize(latencies)
+    summary["rps"] = len(latencies) / duration
+    return summary
+
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 30) -> None:
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def launch(workers: int, supabase_url: str, snapshot_dir: str) -> Tuple[str, subprocess.Popen]:
+    port = free_port()
+    env = dict(
+        os.environ,
+        SUPABASE_URL=supabase_url,
+        SUPABASE_KEY=FAKE_SUPABASE_KEY,
+        COMIC_SNAPSHOT_DIR=snapshot_dir,
+    )
+    process = subprocess.Popen(
+        [sys.executable, "server.py", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+        cwd=project_root,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    wait_until_ready(url, process)
+    return url, process
+
+
+def stop(process: subprocess.Popen) -> float:
+    """SIGTERM the server and return how long the graceful shutdown took"""
+    started = time.perf_counter()
+    process.send_signal(signal.SIGTERM)
+    process.wait(timeout=120)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2], help="Worker counts to compare")
+    parser.add_argument("--url", help="Benchmark an already running server instead of launching one")
+    parser.add_argument("--path", action="append", dest="paths", help="Request path (repeatable)")
+    parser.add_argument("--clients", type=int, default=2, help="Load-generating processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="Open connections per client process")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per run")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="Seconds added to each fake PostgREST request")
+    args = parser.parse_args()
+    paths = args.paths or DEFAULT_PATHS
+
+    print(f"paths={paths} clients={args.clients} concurrency={args.concurrency} duration={args.duration}s")
+    if args.url:
+        summary = run_load(args.url, paths, args.clients, args.concurrency, args.duration)
+        print(format_summary(args.url, summary) + f" rps={summary['rps']:.0f}")
+        return
+
+    import tempfile
+
+    db = FakeDatabase()
+    db.seed(stories=200, comics=30)
+    db.insert("comics", [{"date": time.strftime("%Y-%m-%d"), "title": "Today", "story_id": 1}])
+    db.latency["*"] = args.db_latency
+    baseline: Optional[float] = None
+    with FakePostgrestServer(db) as fake, tempfile.TemporaryDirectory() as snapshot_dir:
+        for workers in args.workers:
+            url, process = launch(workers, fake.url, snapshot_dir)
+            try:
+                run_load(url, paths, args.clients, args.concurrency, 1)  # warm caches and connections
+                summary = run_load(url, paths, args.clients, args.concurrency, args.duration)
+            finally:
+                shutdown = stop(process)
+            baseline = baseline or summary["rps"]
+            print(
+                format_summary(f"{workers} worker(s)", summary)
+                + f" rps={summary['rps']:.0f} ({summary['rps'] / baseline:.2f}x) shutdown={shutdown:.1f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Shared helpers for the benchmark scripts"""
+import os
+import sys
+import math
+from typing import Dict, List
+
+# Allow running the scripts directly as well as with ``python -m``
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# The OpenAI client refuses to initialise without a key, even when unused
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+    }
+
+
+def format_summary(name: str, summary: Dict[str, float]) -> str:
+    return (
+        f"{name:<32} n={summary['count']:<6} p50={summary['p50_ms']:8.2f}ms "
+        f"p95={summary['p95_ms']:8.2f}ms p99={summary['p99_ms']:8.2f}ms max={summary['max_ms']:8.2f}ms"
+    )
+
+
+def use_fake_supabase(url: str) -> None:
+    """Point the application's cached Supabase client at a fake server"""
+    from benchmarks.fake_postgrest import FAKE_SUPABASE_KEY
+    from db import supabase_client
+
+    os.environ["SUPABASE_URL"] = url
+    os.environ["SUPABASE_KEY"] = FAKE_SUPABASE_KEY
+    supabase_client.SupabaseClient._instance = None
+    supabase_client.get_supabase_client.cache_clear()
+    supabase_client.get_comic_repository.cache_clear()
+    supabase_client.get_panel_repository.cache_clear()
+
+
+def app_client():
+    """HTTP client that drives the ASGI app in-process"""
+    import httpx
+    from api.main import app
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None)
+
+
+def use_fake_openai(url: str) -> None:
+    """Point the OpenAI integration at a fake server"""
+    from openai import AsyncOpenAI
+    from api.integrations import openai_integration
+
+    openai_integration.async_client = AsyncOpenAI(api_key="sk-benchmark", base_url=url, max_retries=0)
@@ -0,0 +1,325 @@
+"""In-process stand-in for the OpenAI API
+
+Serves the endpoints the app calls through the official client (Assistants
+threads, messages and runs, Chat Completions with optional streaming, and
+image generation) with configurable latency
+and failure injection, so generation paths can be benchmarked without
+credentials or spend.
+"""
+import json
+import random
+import re
+import socket
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+WORDS = (
+    "balloon festival library zoo rainy monday parking lot snack umbrella kite bakery "
+    "robot garden lighthouse penguin bicycle museum train station puppy pancake"
+).split()
+
+
+def make_story(rng: random.Random, sentences: int = 7) -> tuple:
+    """(title, story sentences) without trailing periods"""
+    title = " ".join(rng.choices(WORDS, k=3)).title()
+    body = [" ".join(rng.choices(WORDS, k=rng.randint(5, 10))).capitalize() for _ in range(sentences - 1)]
+    return title, body
+
+
+def make_story_text(rng: random.Random, sentences: int = 7) -> str:
+    """A title line followed by short sentences, shaped like the assistant's replies"""
+    title, body = make_story(rng, sentences)
+    return title + ".\n" + " ".join(sentence + "." for sentence in body)
+
+
+class FakeOpenAIState:
+    """Latency, failure and call-count settings shared by all requests"""
+
+    def __init__(self):
+        self.image_latency = 0.5
+        self.image_failure_every = 0  # fail every Nth image request when > 0
+        self.request_latency = 0.0  # added to every thread, message and run call
+        self.run_duration = 2.0  # seconds before a run reports completed
+        self.run_failure_every = 0  # fail every Nth assistant run when > 0
+        self.chat_latency = 2.0  # seconds to produce a whole chat completion
+        self.chat_chunks = 20  # streamed completions arrive in this many pieces
+        self.chat_failure_every = 0  # fail every Nth chat completion when > 0
+        self.story_sentences = 7
+        self.threads: Dict[str, Dict[str, Any]] = {}
+        self.calls: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.rng = random.Random(7)
+
+    def count(self, endpoint: str) -> int:
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            return self.calls[endpoint]
+
+
+def _message(thread_id: str, role: str, text: str, run_id: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "id": f"msg_{uuid.uuid4().hex}",
+        "object": "thread.message",
+        "created_at": int(time.time()),
+        "thread_id": thread_id,
+        "role": role,
+        "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+        "file_ids": [],
+        "assistant_id": None,
+        "run_id": run_id,
+        "metadata": {},
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "FakeOpenAIServer"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def _send(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> Any:
+        if hasattr(socket, "TCP_QUICKACK"):
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _error(self, status: int, message: str) -> None:
+        self._send(status, {"error": {"message": message, "type": "server_error", "param": None, "code": None}})
+
+    def _images(self, body: Dict[str, Any]) -> None:
+        state = self.server.state
+        number = state.count("images")
+        time.sleep(state.image_latency)
+        if state.image_failure_every and number % state.image_failure_every == 0:
+            self._error(500, "Injected image failure")
+            return
+        self._send(200, {
+            "created": int(time.time()),
+            "data": [{"url": f"https://images.example.com/{uuid.uuid4().hex}.png", "revised_prompt": body.get("prompt")}],
+        })
+
+    def _thread(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        thread = self.server.state.threads.get(thread_id)
+        if thread is None:
+            self._error(404, f"No thread found with id '{thread_id}'")
+        return thread
+
+    def _create_thread(self) -> None:
+        state = self.server.state
+        state.count("threads")
+        thread = {"id": f"thread_{uuid.uuid4().hex}", "object": "thread", "created_at": int(time.time()), "metadata": {}}
+        with state.lock:
+            state.threads[thread["id"]] = {"thread": thread, "messages": [], "runs": {}}
+        self._send(200, thread)
+
+    def _create_message(self, thread_id: str, body: Dict[str, Any]) -> None:
+        self.server.state.count("messages")
+        thread = self._thread(thread_id)
+        if thread is not None:
+            message = _message(thread_id, body.get("role", "user"), body.get("content", ""))
+            thread["messages"].append(message)
+            self._send(200, message)
+
+    def _create_run(self, thread_id: str, body: Dict[str, Any]) -> None:
+        state = self.server.state
+        number = state.count("runs")
+        thread = self._thread(thread_id)
+        if thread is None:
+            return
+        run = {
+            "id": f"run_{uuid.uuid4().hex}",
+            "object": "thread.run",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "assistant_id": body.get("assistant_id"),
+            "status": "queued",
+            "required_action": None,
+            "last_error": None,
+            "expires_at": None,
+            "started_at": None,
+            "cancelled_at": None,
+            "failed_at": None,
+            "completed_at": None,
+            "model": "gpt-fake",
+            "instructions": "",
+            "tools": [],
+            "file_ids": [],
+            "metadata": {},
+            "usage": None,
+        }
+        thread["runs"][run["id"]] = (run, time.monotonic(), bool(state.run_failure_every and number % state.run_failure_every == 0))
+        self._send(200, run)
+
+    def _retrieve_run(self, thread_id: str, run_id: str) -> None:
+        state = self.server.state
+        state.count("run_status")
+        thread = self._thread(thread_id)
+        if thread is None:
+            return
+        if run_id not in thread["runs"]:
+            self._error(404, f"No run found with id '{run_id}'")
+            return
+        run, started, fails = thread["runs"][run_id]
+        if run["status"] in ("queued", "in_progress") and time.monotonic() - started >= state.run_duration:
+            if fails:
+                run.update(status="failed", failed_at=int(time.time()),
+                           last_error={"code": "server_error", "message": "Injected run failure"})
+            else:
+                with state.lock:
+                    text = make_story_text(state.rng, state.story_sentences)
+                thread["messages"].append(_message(thread_id, "assistant", text, run_id))
+                run.update(status="completed", completed_at=int(time.time()))
+        elif run["status"] == "queued":
+            run.update(status="in_progress", started_at=int(time.time()))
+        self._send(200, run)
+
+    def _list_messages(self, thread_id: str) -> None:
+        self.server.state.count("message_list")
+        thread = self._thread(thread_id)
+        if thread is not None:
+            # The API lists newest first by default
+            data: List[Dict[str, Any]] = list(reversed(thread["messages"]))
+            self._send(200, {
+                "object": "list",
+                "data": data,
+                "first_id": data[0]["id"] if data else None,
+                "last_id": data[-1]["id"] if data else None,
+                "has_more": False,
+            })
+
+    def _chat(self, body: Dict[str, Any]) -> None:
+        state = self.server.state
+        number = state.count("chat")
+        if state.chat_failure_every and number % state.chat_failure_every == 0:
+            time.sleep(state.chat_latency)
+            self._error(500, "Injected chat failure")
+            return
+        with state.lock:
+            title, sentences = make_story(state.rng, state.story_sentences)
+        content = json.dumps({"title": title, "sentences": [sentence + "." for sentence in sentences]})
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "gpt-fake")
+
+        if not body.get("stream"):
+            time.sleep(state.chat_latency)
+            self._send(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                }],
+                "usage": {"prompt_tokens": 200, "completion_tokens": 120, "total_tokens": 320},
+            })
+            return
+
+        # Server-sent events over chunked encoding, paced across chat_latency
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        step = max(1, -(-len(content) // state.chat_chunks))
+        pieces = [content[i:i + step] for i in range(0, len(content), step)]
+        for i, piece in enumerate(pieces + [None]):
+            time.sleep(state.chat_latency / (len(pieces) + 1))
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": piece} if piece is not None else {},
+                    "finish_reason": None if piece is not None else "stop",
+                    "logprobs": None,
+                }],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self) -> None:
+        body = self._body()
+        path = urlsplit(self.path).path
+        if path == "/v1/images/generations":
+            self._images(body)
+            return
+        time.sleep(self.server.state.request_latency)
+        match = re.fullmatch(r"/v1/threads(?:/([^/]+)/(messages|runs))?", path)
+        if path == "/v1/chat/completions":
+            self._chat(body)
+        elif not match:
+            self._error(404, f"Unknown endpoint {path}")
+        elif match.group(1) is None:
+            self._create_thread()
+        elif match.group(2) == "messages":
+            self._create_message(match.group(1), body)
+        else:
+            self._create_run(match.group(1), body)
+
+    def do_GET(self) -> None:
+        self._body()
+        path = urlsplit(self.path).path
+        time.sleep(self.server.state.request_latency)
+        match = re.fullmatch(r"/v1/threads/([^/]+)/(messages|runs/([^/]+))", path)
+        if not match:
+            self._error(404, f"Unknown endpoint {path}")
+        elif match.group(3) is None:
+            self._list_messages(match.group(1))
+        else:
+            self._retrieve_run(match.group(1), match.group(3))
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """Threaded HTTP server bound to an ephemeral localhost port"""
+
+    daemon_threads = True
+    request_queue_size = 512
+
+    def __init__(self, state: Optional[FakeOpenAIState] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.state = state or FakeOpenAIState()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients that time out close their sockets mid-response; that is expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.shutdown()
+        self.server_close()
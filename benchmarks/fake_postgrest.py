@@ -0,0 +1,514 @@
+"""In-process stand-in for Supabase's PostgREST API
+
+Implements the subset of PostgREST the app and scripts use (filters, ordering,
+limits, exact counts, inserts, updates, deletes, embedded resources and RPC
+calls) over in-memory tables, with configurable per-table latency and failure
+injection. The real supabase client talks to it over HTTP, so the whole
+request path including the Supabase executor is exercised.
+"""
+import json
+import re
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+# Key accepted by supabase.create_client (it only checks the JWT shape)
+FAKE_SUPABASE_KEY = "fake.supabase.key"
+
+# (parent table, embedded name) -> (target table, parent column, target column, many)
+DEFAULT_RELATIONS = {
+    ("comics", "panels"): ("panels", "id", "comic_id", True),
+    ("comics", "story"): ("story", "story_id", "id", False),
+    ("panels", "comics"): ("comics", "comic_id", "id", False),
+}
+
+# Columns filled in by the database when a row is inserted
+TIMESTAMP_COLUMNS = {"story": ("created_at", "updated_at"), "story_pool": ("created_at",)}
+
+
+def _split_top_level(text: str, sep: str = ",") -> List[str]:
+    """Split on a separator, ignoring separators inside parentheses or quotes"""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        if char == sep and depth == 0 and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if current:
+        parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _coerce(value: str, sample: Any) -> Any:
+    """Convert a query string value to the type of the stored column"""
+    value = value.strip('"')
+    if isinstance(sample, bool):
+        return value.lower() == "true"
+    if isinstance(sample, int):
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    if isinstance(sample, float):
+        return float(value)
+    return value
+
+
+def _like(pattern: str, text: str, flags: int = 0) -> bool:
+    regex = re.escape(pattern.replace("*", "%")).replace("%", ".*").replace("_", ".")
+    return re.fullmatch(regex, text or "", flags) is not None
+
+
+def _matches(row: Dict[str, Any], column: str, expression: str) -> bool:
+    """Evaluate a single PostgREST filter such as ``eq.5`` against a row"""
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    operator, _, raw = expression.partition(".")
+    operator = re.sub(r"\(.*\)$", "", operator)  # fts(english) -> fts
+    value = row.get(column)
+
+    if operator == "is":
+        result = value is None if raw == "null" else value == (raw == "true")
+    elif operator == "in":
+        candidates = [_coerce(v, value) for v in _split_top_level(raw.strip("()"))]
+        result = value in candidates
+    elif operator in ("like", "ilike"):
+        result = _like(raw, str(value or ""), re.IGNORECASE if operator == "ilike" else 0)
+    elif operator in ("fts", "plfts", "phfts", "wfts"):
+        words = [w.lower() for w in re.split(r"[\s&|'!()]+", raw) if w]
+        haystack = str(value or "").lower()
+        result = all(word in haystack for word in words)
+    else:
+        if value is None:
+            result = False
+        else:
+            other = _coerce(raw, value)
+            result = {
+                "eq": value == other,
+                "neq": value != other,
+                "gt": value > other,
+                "gte": value >= other,
+                "lt": value < other,
+                "lte": value <= other,
+            }[operator]
+    return not result if negate else result
+
+
+def _logic(row: Dict[str, Any], operator: str, body: str) -> bool:
+    """Evaluate an ``or=(...)``/``and=(...)`` tree against a row"""
+    results = []
+    for term in _split_top_level(body.strip()[1:-1]):
+        nested = re.match(r"^(not\.)?(and|or)(\(.*\))$", term)
+        if nested:
+            outcome = _logic(row, nested.group(2), nested.group(3))
+            results.append(not outcome if nested.group(1) else outcome)
+        else:
+            column, _, expression = term.partition(".")
+            results.append(_matches(row, column, expression))
+    return any(results) if operator == "or" else all(results)
+
+
+def search_stories(db: "FakeDatabase", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Approximation of the search_stories RPC: every word must match, titles rank higher"""
+    words = [word.lower() for word in re.findall(r"\w+", params.get("search_query", ""))]
+    fields = params.get("search_fields", "all")
+    results = []
+    with db.lock:
+        for row in db.tables.get("story", []):
+            title = (row.get("title") or "").lower() if fields in ("all", "title") else ""
+            body = (row.get("story") or "").lower() if fields in ("all", "story") else ""
+            if words and all(word in title or word in body for word in words):
+                rank = sum(2 * title.count(word) + body.count(word) for word in words) / 10
+                results.append({"id": row["id"], "title": row["title"], "created_at": row["created_at"], "rank": rank})
+    results.sort(key=lambda r: (r["rank"], r["created_at"], r["id"]), reverse=True)
+    offset = params.get("result_offset", 0)
+    return results[offset:offset + params.get("result_limit", 10)]
+
+
+def create_comic_with_panels(db: "FakeDatabase", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Same contract as the create_comic_with_panels database function"""
+    with db.lock:
+        comic_data, story_data = params["comic_data"], params.get("story_data")
+        story = None
+        if story_data:
+            story = db.insert("story", [{"title": story_data["title"], "story": story_data["story"]}])[0]
+        elif comic_data.get("story_id") is not None:
+            story = next((row for row in db.tables["story"] if row["id"] == comic_data["story_id"]), None)
+        comic = db.insert("comics", [{
+            "date": comic_data["date"],
+            "title": comic_data["title"],
+            "story_id": story["id"] if story else None,
+        }])[0]
+        panels = db.insert("panels", [
+            {
+                "comic_id": comic["id"],
+                "sentence": panel["sentence"],
+                "image_url": panel.get("image_url") or "",
+                "panel_order": panel["panel_order"],
+            }
+            for panel in params.get("panels_data") or []
+        ])
+    if story:
+        story = {key: story.get(key) for key in ("id", "title", "story", "created_at")}
+    return [{**comic, "panels": sorted(panels, key=lambda p: p["panel_order"]), "story": story}]
+
+
+def create_comics_with_panels(db: "FakeDatabase", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Same contract as the create_comics_with_panels database function"""
+    with db.lock:
+        return [create_comic_with_panels(db, item)[0] for item in params["items"]]
+
+
+def claim_pooled_story(db: "FakeDatabase", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Same contract as the claim_pooled_story database function"""
+    with db.lock:
+        pool = db.tables.setdefault("story_pool", [])
+        if not pool:
+            return []
+        pooled = min(pool, key=lambda row: (row["created_at"], row["id"]))
+        pool.remove(pooled)
+        story = db.insert("story", [{"title": pooled["title"], "story": pooled["story"]}])[0]
+    return [{key: story.get(key) for key in ("id", "title", "story", "created_at")}]
+
+
+def claim_idempotency_key(db: "FakeDatabase", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Same contract as the claim_idempotency_key database function"""
+    now = datetime.now(timezone.utc)
+    with db.lock:
+        keys = db.tables.setdefault("idempotency_keys", [])
+        keys[:] = [row for row in keys if datetime.fromisoformat(row["expires_at"]) >= now]
+        scope = (params["request_method"], params["request_path"], params["request_key"])
+        row = next((row for row in keys if (row["method"], row["path"], row["idempotency_key"]) == scope), None)
+        claimed = row is None
+        if claimed:
+            row = {
+                "method": scope[0], "path": scope[1], "idempotency_key": scope[2],
+                "fingerprint": params["request_fingerprint"], "claim_id": params["request_claim_id"],
+                "expires_at": (now + timedelta(seconds=params["lease_seconds"])).isoformat(),
+                "status_code": None, "body": None, "headers": None,
+            }
+            keys.append(row)
+        return [{
+            "claimed": claimed,
+            "stored_fingerprint": row["fingerprint"],
+            "response_status": row["status_code"],
+            "response_body": row["body"],
+            "response_headers": row["headers"],
+        }]
+
+
+def sync_archive_sequences(db: "FakeDatabase", params: Dict[str, Any]) -> None:
+    # insert() already keeps the sequences past explicit ids
+    return None
+
+
+DEFAULT_RPCS = {
+    "search_stories": search_stories,
+    "create_comic_with_panels": create_comic_with_panels,
+    "create_comics_with_panels": create_comics_with_panels,
+    "claim_pooled_story": claim_pooled_story,
+    "sync_archive_sequences": sync_archive_sequences,
+    "claim_idempotency_key": claim_idempotency_key,
+}
+
+
+class FakeDatabase:
+    """In-memory tables shared by every request handled by the fake server"""
+
+    def __init__(self, relations: Optional[Dict[Tuple[str, str], Tuple[str, str, str, bool]]] = None):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {"comics": [], "panels": [], "story": [], "story_pool": [], "idempotency_keys": []}
+        self.sequences: Dict[str, int] = {}
+        self.relations = dict(DEFAULT_RELATIONS if relations is None else relations)
+        self.rpcs: Dict[str, Callable[["FakeDatabase", Dict[str, Any]], Any]] = dict(DEFAULT_RPCS)
+        self.latency: Dict[str, float] = {}
+        self.failure_rate: Dict[str, float] = {}
+        self.request_count = 0
+        self.lock = threading.RLock()
+        self._failures = 0
+
+    # Seeding helpers
+
+    def insert(self, table: str, rows: List[Dict[str, Any]], merge: bool = False) -> List[Dict[str, Any]]:
+        """Insert rows, assigning ids and timestamps like Postgres would
+
+        With ``merge`` a row whose id already exists is updated in place, as
+        an upsert with ``Prefer: resolution=merge-duplicates`` does.
+        """
+        with self.lock:
+            stored = []
+            existing = self.tables.setdefault(table, [])
+            positions = {row["id"]: i for i, row in enumerate(existing)} if merge else {}
+            for row in rows:
+                row = dict(row)
+                if row.get("id") is None:
+                    self.sequences[table] = self.sequences.get(table, 0) + 1
+                    row["id"] = self.sequences[table]
+                else:
+                    self.sequences[table] = max(self.sequences.get(table, 0), row["id"])
+                if row["id"] in positions:
+                    existing[positions[row["id"]]].update(row)
+                    stored.append(dict(existing[positions[row["id"]]]))
+                    continue
+                for column in TIMESTAMP_COLUMNS.get(table, ()):
+                    row.setdefault(column, datetime.now(timezone.utc).isoformat())
+                positions[row["id"]] = len(existing)
+                existing.append(row)
+                stored.append(dict(row))
+            return stored
+
+    def seed(self, stories: int = 0, comics: int = 0, panels_per_comic: int = 6) -> None:
+        """Populate the tables with deterministic sample content"""
+        story_rows = self.insert("story", [
+            {
+                "title": f"Story {i}",
+                "story": f"Two strangers meet at place {i}. They share a snack. Everyone smiles.",
+                "created_at": datetime.fromtimestamp(1_700_000_000 + i * 60, timezone.utc).isoformat(),
+            }
+            for i in range(1, stories + 1)
+        ])
+        for i in range(1, comics + 1):
+            story_id = story_rows[(i - 1) % len(story_rows)]["id"] if story_rows else None
+            day = datetime.fromtimestamp(1_700_000_000 + i * 86_400, timezone.utc).date()
+            comic = self.insert("comics", [{"title": f"Comic {i}", "date": day.isoformat(), "story_id": story_id}])[0]
+            self.insert("panels", [
+                {
+                    "comic_id": comic["id"],
+                    "sentence": f"Sentence {order} of comic {i}",
+                    "image_url": f"https://images.example.com/{comic['id']}/{order}.png",
+                    "panel_order": order,
+                }
+                for order in range(1, panels_per_comic + 1)
+            ])
+
+    # Query evaluation
+
+    def project(self, table: str, rows: List[Dict[str, Any]], params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Apply the select parameter, including embedded resources, to result rows"""
+        with self.lock:
+            select = dict(params).get("select", "*")
+            return [self._project(table, row, select, params) for row in rows]
+
+    def _project(self, table: str, row: Dict[str, Any], select: str, params: List[Tuple[str, str]]) -> Dict[str, Any]:
+        columns = _split_top_level(select or "*")
+        result: Dict[str, Any] = {}
+        for column in columns:
+            embed = re.match(r"^(?:(\w+):)?(\w+)(?:!\w+)?\((.*)\)$", column)
+            if embed:
+                alias, name, inner = embed.group(1), embed.group(2), embed.group(3)
+                target, local, remote, many = self.relations[(table, name)]
+                related = [
+                    other for other in self.tables.get(target, [])
+                    if other.get(remote) == row.get(local) and row.get(local) is not None
+                ]
+                prefix = f"{alias or name}."
+                nested = [(key[len(prefix):], value) for key, value in params if key.startswith(prefix)]
+                related = [self._project(target, other, inner, nested) for other in self._order(related, nested)]
+                result[alias or name] = related if many else (related[0] if related else None)
+            elif column == "*":
+                result.update(row)
+            elif column != "count":
+                name = column.split("::")[0]
+                alias, _, source = name.partition(":")
+                result[alias] = row.get(source or alias)
+        return result
+
+    def _filter(self, rows: List[Dict[str, Any]], params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        reserved = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+        for key, value in params:
+            if key in reserved or "." in key:
+                continue
+            if key in ("or", "and"):
+                rows = [row for row in rows if _logic(row, key, value)]
+            else:
+                rows = [row for row in rows if _matches(row, key, value)]
+        return rows
+
+    @staticmethod
+    def _order(rows: List[Dict[str, Any]], params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        terms = []
+        for key, value in params:
+            if key == "order":
+                terms.extend(_split_top_level(value))
+        # Stable sorts applied from the least significant key backwards
+        for term in reversed(terms):
+            column, *modifiers = term.split(".")
+            descending = "desc" in modifiers
+            present = [row for row in rows if row.get(column) is not None]
+            missing = [row for row in rows if row.get(column) is None]
+            present.sort(key=lambda row: row[column], reverse=descending)
+            rows = missing + present if "nullsfirst" in modifiers else present + missing
+        return rows
+
+    def query(self, table: str, params: List[Tuple[str, str]], range_header: Optional[str]) -> Tuple[List[Dict[str, Any]], int, int]:
+        """Run a read query and return (rows, offset, total matching rows)"""
+        with self.lock:
+            rows = self._filter(list(self.tables.get(table, [])), params)
+            rows = self._order(rows, params)
+            total = len(rows)
+            lookup = dict(params)
+            offset = int(lookup.get("offset", 0))
+            limit = int(lookup["limit"]) if "limit" in lookup else None
+            if range_header:
+                start, _, end = range_header.partition("-")
+                offset = int(start)
+                if end:
+                    limit = int(end) - offset + 1
+            rows = rows[offset:offset + limit if limit is not None else None]
+            return self.project(table, rows, params), offset, total
+
+    def update(self, table: str, params: List[Tuple[str, str]], data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self.lock:
+            updated = []
+            for row in self._filter(self.tables.get(table, []), params):
+                row.update(data)
+                updated.append(dict(row))
+            return updated
+
+    def delete(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        with self.lock:
+            doomed = self._filter(self.tables.get(table, []), params)
+            doomed_ids = {id(row) for row in doomed}
+            self.tables[table] = [row for row in self.tables.get(table, []) if id(row) not in doomed_ids]
+            if table == "comics":
+                comic_ids = {row["id"] for row in doomed}
+                self.tables["panels"] = [p for p in self.tables.get("panels", []) if p.get("comic_id") not in comic_ids]
+            return [dict(row) for row in doomed]
+
+    def should_fail(self, resource: str) -> bool:
+        rate = self.failure_rate.get(resource, 0.0)
+        if rate <= 0:
+            return False
+        with self.lock:
+            self._failures += 1
+            return (self._failures * rate) % 1 < rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "FakePostgrestServer"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def _send(self, status: int, payload: Any = None, headers: Optional[Dict[str, str]] = None) -> None:
+        body = b"" if payload is None else json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _quickack(self) -> None:
+        # The client writes headers and body separately; acknowledge at once so
+        # Nagle on its side does not stall behind our delayed ACK
+        if hasattr(socket, "TCP_QUICKACK"):
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+    def _body(self) -> Any:
+        self._quickack()
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def _handle(self) -> None:
+        db = self.server.db
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        params = parse_qsl(url.query, keep_blank_values=True)
+        body = self._body()  # always drained: the client sends ``{}`` even on GET
+        if not path.startswith("/rest/v1/"):
+            self._send(404, {"message": f"Unknown path {path}", "code": "404", "hint": None, "details": None})
+            return
+        resource = path[len("/rest/v1/"):]
+        db.request_count += 1
+
+        delay = db.latency.get(resource, db.latency.get("*", 0.0))
+        if delay:
+            time.sleep(delay)
+        if db.should_fail(resource):
+            self._send(503, {"message": "Injected failure", "code": "503", "hint": None, "details": None})
+            return
+
+        prefer = self.headers.get("Prefer", "")
+        try:
+            if resource.startswith("rpc/"):
+                name = resource[len("rpc/"):]
+                if name not in db.rpcs:
+                    self._send(404, {"message": f"Could not find the function {name}", "code": "PGRST202", "hint": None, "details": None})
+                    return
+                self._send(200, db.rpcs[name](db, body or {}))
+            elif self.command in ("GET", "HEAD"):
+                rows, offset, total = db.query(resource, params, self.headers.get("Range"))
+                headers = {}
+                if "count=" in prefer:
+                    end = offset + len(rows) - 1
+                    span = f"{offset}-{end}" if rows else "*"
+                    headers["Content-Range"] = f"{span}/{total}"
+                if self.headers.get("Accept") == "application/vnd.pgrst.object+json":
+                    if len(rows) != 1:
+                        self._send(406, {"message": "JSON object requested, multiple (or no) rows returned", "code": "PGRST116", "hint": None, "details": f"Results contain {len(rows)} rows"})
+                        return
+                    self._send(200, rows[0], headers)
+                else:
+                    self._send(200, rows, headers)
+            elif self.command == "POST":
+                rows = body if isinstance(body, list) else [body]
+                stored = db.insert(resource, rows, merge="resolution=merge-duplicates" in prefer)
+                self._send(201, db.project(resource, stored, params) if "return=representation" in prefer else [])
+            elif self.command == "PATCH":
+                self._send(200, db.project(resource, db.update(resource, params, body or {}), params))
+            elif self.command == "DELETE":
+                self._send(200, db.project(resource, db.delete(resource, params), params))
+            else:
+                self._send(405, {"message": "Method not allowed", "code": "405", "hint": None, "details": None})
+        except Exception as e:  # surfaced to the client like a PostgREST error
+            self._send(400, {"message": str(e), "code": "400", "hint": None, "details": None})
+
+    do_GET = do_HEAD = do_POST = do_PATCH = do_DELETE = _handle
+
+
+class FakePostgrestServer(ThreadingHTTPServer):
+    """Threaded HTTP server bound to an ephemeral localhost port"""
+
+    daemon_threads = True
+    request_queue_size = 512
+
+    def __init__(self, db: Optional[FakeDatabase] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.db = db or FakeDatabase()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients that time out close their sockets mid-response; that is expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def __enter__(self) -> "FakePostgrestServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.shutdown()
+        self.server_close()
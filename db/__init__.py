@@ -3,8 +3,13 @@
 from .supabase_client import (
     get_supabase_client,
     get_comic_repository,
-    get_panel_repository
+    get_panel_repository,
+    get_supabase_executor,
+    close_supabase_client,
+    supabase_pool_stats,
+    run_query
 )
+from .cache import get_cache, cache_stats
 from .exceptions.database import (
     DatabaseError,
     RecordNotFoundError,
@@ -16,6 +21,12 @@ __all__ = [
     'get_supabase_client',
     'get_comic_repository',
     'get_panel_repository',
+    'get_supabase_executor',
+    'close_supabase_client',
+    'supabase_pool_stats',
+    'run_query',
+    'get_cache',
+    'cache_stats',
     'DatabaseError',
     'RecordNotFoundError',
     'DatabaseConnectionError',
@@ -0,0 +1,146 @@
+import os
+import time
+import asyncio
+import logging
+import orjson
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Union
+from supabase import Client
+from .executor import run_query
+from .pagination import apply_keyset, split_page
+from .exceptions.database import DatabaseError, ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Archived tables, parents first, with the columns that are written back on
+# import (generated columns such as the search vectors are left out)
+ARCHIVE_TABLES = {
+    "story": "id, title, story, created_at",
+    "comics": "id, date, title, story_id",
+    "panels": "id, comic_id, sentence, image_url, panel_order",
+}
+_COLUMNS = {table: [column.strip() for column in columns.split(",")] for table, columns in ARCHIVE_TABLES.items()}
+
+async def export_archive(supabase: Client, page_size: int = 500) -> AsyncIterator[bytes]:
+    """Stream every story, comic and panel as NDJSON, one page of lines per chunk
+
+    Each line is {"table": ..., "row": {...}}. Tables come parents first and
+    each in id order, so the output can be imported in file order. Pages are
+    read by keyset on id, and the next page is fetched while the current one
+    is being sent, so memory stays at about two pages whatever the archive
+    size. Rows written during the export may or may not be included.
+    """
+    for table, columns in ARCHIVE_TABLES.items():
+        def fetch(cursor: Optional[str]) -> "asyncio.Future":
+            query = apply_keyset(supabase.table(table).select(columns), ("id",), page_size, cursor)
+            return asyncio.ensure_future(run_query(query))
+
+        pending = fetch(None)
+        try:
+            while True:
+                response = await pending
+                rows, cursor = split_page(response.data, ("id",), page_size)
+                pending = fetch(cursor) if cursor else None
+                if rows:
+                    yield b"".join(orjson.dumps({"table": table, "row": row}) + b"\n" for row in rows)
+                if pending is None:
+                    break
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+class ArchiveImporter:
+    """Bulk import of an export_archive NDJSON stream
+
+    Consecutive rows of a table are upserted by id in batches of
+    `batch_size`, one request per batch, while the next batch is parsed.
+    After every written batch the number of input lines it covers is saved
+    to `checkpoint_path`, and a later run with the same file skips those
+    lines, so an interrupted import resumes where it stopped. Batches are
+    upserts, so rewriting the rows of the batch in flight is harmless.
+    Once everything is written the id sequences are moved past the imported
+    ids, and the checkpoint is removed.
+    """
+
+    def __init__(self, supabase: Client, batch_size: int = 1000, checkpoint_path: Optional[str] = None):
+        self.supabase = supabase
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.counts: Dict[str, int] = {table: 0 for table in ARCHIVE_TABLES}
+        self._writing: Optional[asyncio.Task] = None
+
+    def _load_checkpoint(self) -> int:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path, "rb") as f:
+            return int(orjson.loads(f.read())["lines"])
+
+    def _save_checkpoint(self, lines: int) -> None:
+        if not self.checkpoint_path:
+            return
+        temporary = self.checkpoint_path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(orjson.dumps({"lines": lines, "counts": self.counts}))
+        os.replace(temporary, self.checkpoint_path)
+
+    async def _write(self, table: str, rows: List[Dict[str, Any]], lines: int) -> None:
+        query = self.supabase.table(table).upsert(rows, returning="minimal", on_conflict="id")
+        await run_query(query)
+        self.counts[table] += len(rows)
+        self._save_checkpoint(lines)
+
+    async def _flush(self, table: Optional[str], rows: List[Dict[str, Any]], lines: int) -> None:
+        """Queue a batch once the previous one is written, keeping file order"""
+        if self._writing is not None:
+            await self._writing
+            self._writing = None
+        if rows:
+            self._writing = asyncio.create_task(self._write(table, rows, lines))
+
+    async def run(self, lines: Iterable[Union[str, bytes]]) -> Dict[str, Any]:
+        """Import the archive lines; returns rows written per table, lines skipped and rows per second"""
+        started = time.perf_counter()
+        skip = self._load_checkpoint()
+        if skip:
+            logger.info("Resuming import after line %d", skip)
+
+        table: Optional[str] = None
+        batch: List[Dict[str, Any]] = []
+        number = 0
+        try:
+            for number, line in enumerate(lines, 1):
+                if number <= skip or not line.strip():
+                    continue
+                try:
+                    record = orjson.loads(line)
+                    columns = _COLUMNS[record["table"]]
+                    row = {column: record["row"][column] for column in columns if column in record["row"]}
+                except (orjson.JSONDecodeError, KeyError, TypeError) as e:
+                    raise ValidationError(f"Invalid archive line {number}: {e}")
+
+                if record["table"] != table or len(batch) >= self.batch_size:
+                    await self._flush(table, batch, number - 1)
+                    table, batch = record["table"], []
+                batch.append(row)
+            await self._flush(table, batch, number)
+            await self._flush(None, [], number)
+        except BaseException:
+            if self._writing is not None:
+                # Let the batch in flight finish so its checkpoint is kept
+                await asyncio.gather(self._writing, return_exceptions=True)
+            raise
+
+        # Explicit ids do not advance the sequences; new rows must not collide
+        response = await run_query(self.supabase.rpc("sync_archive_sequences", {}))
+        if hasattr(response, "error") and response.error:
+            raise DatabaseError(f"Supabase error: {response.error.message}")
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+        elapsed = time.perf_counter() - started
+        written = sum(self.counts.values())
+        return {
+            "rows": dict(self.counts),
+            "skipped_lines": min(skip, number),
+            "seconds": round(elapsed, 2),
+            "rows_per_second": round(written / elapsed) if elapsed else written,
+        }
@@ -0,0 +1,161 @@
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+from .metrics import CACHE_EVICTIONS, CACHE_REQUESTS
+
+T = TypeVar('T')
+
+# Defaults for every named cache; CACHE_MAX_ENTRIES=0 disables caching
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL = 300.0
+
+_MISSING = object()
+
+class TTLCache:
+    """Bounded in-memory cache with least-recently-used eviction and expiry
+
+    Concurrent get_or_load misses on a key share one load. A load belongs
+    to the generation of its key that was current when it started:
+    set(), invalidate() and clear() end that generation, and a load from
+    an ended generation returns its value to its callers without caching
+    it, so a read that raced a write never outlives the invalidation.
+    """
+
+    def __init__(self, name: str, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        # Loads of the current generation of each key, while they run
+        self._loads: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self._lock = threading.Lock()
+        # Bound once so lookups only pay for an increment
+        self._hit_counter = CACHE_REQUESTS.labels(name, "hit")
+        self._miss_counter = CACHE_REQUESTS.labels(name, "miss")
+        self._eviction_counter = CACHE_EVICTIONS.labels(name)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a live entry, counting the lookup as a hit or a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._hit_counter.inc()
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            self._miss_counter.inc()
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store an entry, evicting the least recently used ones if full
+
+        A load of the key still running started before this value was
+        known, so it will not replace it.
+        """
+        with self._lock:
+            self._loads.pop(key, None)
+            self._store(key, value)
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+            self._eviction_counter.inc()
+
+    def invalidate(self, *keys: Hashable) -> None:
+        """Drop entries if present, and keep loads already running from caching"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._loads.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry, and keep loads already running from caching"""
+        with self._lock:
+            self._entries.clear()
+            self._loads.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        """Return the cached value, or await the loader and cache its result
+
+        Callers missing the same key meanwhile wait for the same load, which
+        is shielded from them. Exceptions from the loader (including
+        not-found errors) are shared with those callers but not cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            load = self._loads.get(key)
+            if load is None or load.get_loop() is not loop:
+                load = loop.create_task(self._load(key, loader))
+                load.add_done_callback(_retrieve)
+                self._loads[key] = load
+        return await asyncio.shield(load)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        try:
+            value = await loader()
+        except BaseException:
+            with self._lock:
+                if self._loads.get(key) is asyncio.current_task():
+                    del self._loads[key]
+            raise
+        with self._lock:
+            # Only cache a value whose generation is still current
+            if self._loads.get(key) is asyncio.current_task():
+                del self._loads[key]
+                self._store(key, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl
+        }
+
+def _retrieve(load: "asyncio.Task[Any]") -> None:
+    if not load.cancelled():
+        load.exception()  # retrieved, even if every caller went away
+
+_caches: Dict[str, TTLCache] = {}
+_caches_lock = threading.Lock()
+
+def get_cache(name: str) -> TTLCache:
+    """Returns the process-wide cache with the given name, creating it on first use"""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = TTLCache(
+                name,
+                max_entries=int(os.environ.get("CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                ttl=float(os.environ.get("CACHE_TTL", DEFAULT_TTL))
+            )
+        return _caches[name]
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats for every cache created so far"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from typing import Any, Hashable, Optional
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from .metrics import SUPABASE_EXECUTOR_WAIT, SUPABASE_REQUEST_DURATION, SUPABASE_REQUEST_ERRORS, query_labels
+from .singleflight import SingleFlight
+from .tracing import RequestTrace, current_trace
+
+# Upper bound on concurrent blocking PostgREST calls per process
+DEFAULT_MAX_WORKERS = 16
+
+# Identical reads in flight at the same time share one PostgREST call
+SINGLE_FLIGHT = os.environ.get("SUPABASE_SINGLE_FLIGHT", "true").lower() == "true"
+_READ_METHODS = ("GET", "HEAD")
+
+@lru_cache()
+def get_supabase_executor() -> ThreadPoolExecutor:
+    """Returns the thread pool used for Supabase calls (cached)"""
+    max_workers = int(os.environ.get("SUPABASE_MAX_WORKERS", DEFAULT_MAX_WORKERS))
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="supabase")
+
+def shutdown_supabase_executor() -> None:
+    """Stop the thread pool once in-flight calls finish; a new one is made on next use"""
+    if get_supabase_executor.cache_info().currsize:
+        get_supabase_executor().shutdown(wait=True)
+        get_supabase_executor.cache_clear()
+
+@lru_cache()
+def get_read_flights() -> SingleFlight:
+    """Returns the process-wide single-flight group for Supabase reads (cached)"""
+    return SingleFlight("supabase")
+
+async def run_query(query: Any, shared: Optional[bool] = None) -> Any:
+    """Execute a Supabase query builder without blocking the event loop
+
+    The supabase client only ships a synchronous transport, so the request is
+    handed to a bounded thread pool and awaited from the calling coroutine.
+
+    Reads (GET/HEAD, or any query with shared=True such as a read-only RPC)
+    that are identical to one already in flight wait for it and get the
+    same response instead of making their own call, so a burst of equal
+    requests costs one database round trip. Callers must not mutate the
+    response. Any write makes later reads start fresh calls, so a read
+    begun after a write completes never gets an older result.
+    """
+    reads = getattr(query, "http_method", "") in _READ_METHODS
+    if shared is None:
+        shared = reads
+    if shared and SINGLE_FLIGHT:
+        return await get_read_flights().do(query_key(query), lambda: _execute(query))
+    try:
+        return await _execute(query)
+    finally:
+        if not shared:
+            get_read_flights().forget()
+
+def query_key(query: Any) -> Hashable:
+    """Everything that determines a query's response, with parameters in a canonical order"""
+    return (
+        type(query),
+        query.http_method,
+        str(query.session.base_url),
+        query.path,
+        tuple(sorted(query.params.multi_items())),
+        tuple(sorted(query.headers.items())),
+        json.dumps(query.json, sort_keys=True, default=str) if query.json else None
+    )
+
+async def _execute(query: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_supabase_executor(), _timed_execute, query, time.perf_counter(), current_trace.get()
+    )
+
+def _timed_execute(query: Any, queued_at: float, trace: Optional[RequestTrace]) -> Any:
+    """Run a query on an executor thread, recording queue wait and round-trip time"""
+    started = time.perf_counter()
+    SUPABASE_EXECUTOR_WAIT.observe(started - queued_at)
+    labels = query_labels(query)
+    if trace is not None:
+        trace.threads.add(threading.get_ident())
+    try:
+        return query.execute()
+    except Exception:
+        SUPABASE_REQUEST_ERRORS.labels(*labels).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        SUPABASE_REQUEST_DURATION.labels(*labels).observe(elapsed)
+        if trace is not None:
+            trace.threads.discard(threading.get_ident())
+            trace.add("supabase %s.%s" % labels, elapsed)
+            trace.add("supabase queue", started - queued_at)
@@ -0,0 +1,42 @@
+import os
+from typing import Any, Dict
+import httpx
+
+def _env(prefix: str, name: str, default: Any) -> str:
+    return os.environ.get(f"{prefix}_{name}", str(default))
+
+def pool_settings(prefix: str, max_connections: int, timeout: float, connect_timeout: float = 5.0) -> Dict[str, Any]:
+    """httpx client arguments for a connection pool configured from the environment
+
+    Reads <prefix>_POOL_MAX_CONNECTIONS, <prefix>_POOL_MAX_KEEPALIVE,
+    <prefix>_POOL_KEEPALIVE_EXPIRY, <prefix>_HTTP2, <prefix>_CONNECT_TIMEOUT and
+    <prefix>_READ_TIMEOUT, falling back to the given defaults. Idle connections
+    are kept open so bursts reuse them instead of paying new TLS handshakes.
+    HTTP/2 needs the h2 package (pip install httpx[http2]).
+    """
+    max_connections = int(_env(prefix, "POOL_MAX_CONNECTIONS", max_connections))
+    read_timeout = float(_env(prefix, "READ_TIMEOUT", timeout))
+    return {
+        "limits": httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=int(_env(prefix, "POOL_MAX_KEEPALIVE", max_connections)),
+            keepalive_expiry=float(_env(prefix, "POOL_KEEPALIVE_EXPIRY", 60)),
+        ),
+        "timeout": httpx.Timeout(read_timeout, connect=float(_env(prefix, "CONNECT_TIMEOUT", connect_timeout))),
+        "http2": _env(prefix, "HTTP2", "false").lower() == "true",
+    }
+
+def pool_stats(client: Any) -> Dict[str, int]:
+    """Connection usage of an httpx client's default transport pool"""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    if pool is None:
+        return {}
+    connections = list(pool.connections)
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {
+        "connections": len(connections),
+        "in_use": len(connections) - idle,
+        "idle": idle,
+        "waiting": sum(1 for request in list(pool._requests) if request.connection is None),
+        "max_connections": pool._max_connections,
+    }
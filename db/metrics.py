@@ -0,0 +1,46 @@
+from typing import Any, Tuple
+from prometheus_client import Counter, Histogram
+
+# Latency buckets for PostgREST round trips, in seconds
+SUPABASE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+SUPABASE_REQUEST_DURATION = Histogram(
+    "supabase_request_duration_seconds",
+    "Supabase (PostgREST) call latency",
+    ["table", "operation"],
+    buckets=SUPABASE_BUCKETS
+)
+SUPABASE_EXECUTOR_WAIT = Histogram(
+    "supabase_executor_wait_seconds",
+    "Time Supabase calls wait for a free executor thread",
+    buckets=SUPABASE_BUCKETS
+)
+SUPABASE_REQUEST_ERRORS = Counter(
+    "supabase_request_errors_total",
+    "Supabase calls that raised an error",
+    ["table", "operation"]
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Read-through cache lookups",
+    ["cache", "result"]
+)
+CACHE_EVICTIONS = Counter(
+    "cache_evictions_total",
+    "Entries evicted to stay within the cache size",
+    ["cache"]
+)
+SINGLE_FLIGHT_CALLS = Counter(
+    "single_flight_calls_total",
+    "Calls that ran, or shared the result of an identical call already in flight",
+    ["name", "result"]
+)
+
+_OPERATIONS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+def query_labels(query: Any) -> Tuple[str, str]:
+    """(table, operation) labels for a postgrest-py request builder"""
+    path = getattr(query, "path", "").strip("/")
+    if path.startswith("rpc/"):
+        return path[len("rpc/"):], "rpc"
+    return path or "unknown", _OPERATIONS.get(getattr(query, "http_method", ""), "other")
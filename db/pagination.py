@@ -0,0 +1,79 @@
+import json
+import base64
+import binascii
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .exceptions.database import ValidationError
+
+# Largest page a caller may request in one round trip
+MAX_PAGE_SIZE = 100
+
+# Characters PostgREST treats as syntax inside logical filters
+_RESERVED_CHARS = ",:()"
+
+def encode_cursor(row: Dict[str, Any], columns: Sequence[str]) -> str:
+    """Build an opaque cursor from the sort-key values of the last row on a page"""
+    payload = json.dumps([row[column] for column in columns], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, columns: Sequence[str]) -> List[Any]:
+    """Decode a cursor produced by encode_cursor for the same sort columns"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError("Invalid pagination cursor")
+    if not isinstance(values, list) or len(values) != len(columns) or not all(
+        isinstance(value, (str, int)) and not isinstance(value, bool) for value in values
+    ):
+        raise ValidationError("Invalid pagination cursor")
+    return values
+
+def _quote(value: Any) -> str:
+    text = str(value)
+    if any(char in text for char in _RESERVED_CHARS):
+        return '"' + text.replace('"', '\\"') + '"'
+    return text
+
+def _after(columns: Sequence[str], values: Sequence[Any], operator: str) -> str:
+    """Row-value comparison (a, b, ...) > (x, y, ...) as nested PostgREST or/and terms"""
+    column, value = columns[0], _quote(values[0])
+    if len(columns) == 1:
+        return f"{column}.{operator}.{value}"
+    rest = _after(columns[1:], values[1:], operator)
+    return f"or({column}.{operator}.{value},and({column}.eq.{value},{rest}))"
+
+def apply_keyset(
+    query: Any,
+    columns: Sequence[str],
+    limit: int,
+    cursor: Optional[str] = None,
+    desc: bool = False
+) -> Any:
+    """Order a select by the keyset columns and resume after the cursor
+
+    One extra row is requested so split_page can tell whether another page
+    exists without running a count.
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        condition = _after(columns, values, "lt" if desc else "gt")
+        # PostgREST expects a top-level logical filter as or=(...)
+        if condition.startswith("or("):
+            query.params = query.params.add("or", condition[len("or"):])
+        else:
+            column, _, expression = condition.partition(".")
+            query.params = query.params.add(column, expression)
+    direction = ".desc" if desc else ".asc"
+    query = query.order(",".join(f"{column}{direction}" for column in columns))
+    return query.limit(limit + 1)
+
+def split_page(
+    rows: List[Dict[str, Any]],
+    columns: Sequence[str],
+    limit: int
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim the look-ahead row and return (rows, next_cursor)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1], columns)
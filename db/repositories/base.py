@@ -1,29 +1,73 @@
-from typing import Any, Dict, List, Optional, TypeVar, Generic
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, TypeVar, Generic
 from supabase import Client
 from ..exceptions.database import DatabaseError, RecordNotFoundError
+from ..cache import TTLCache, get_cache
+from ..executor import run_query
+from ..pagination import apply_keyset, split_page
 
 T = TypeVar('T')
 
 class BaseRepository(Generic[T]):
+    # Unique sort key used for keyset pagination
+    order_columns: Tuple[str, ...] = ("id",)
+    order_desc: bool = False
+
     def __init__(self, supabase: Client, table_name: str):
         self.supabase = supabase
         self.table_name = table_name
 
+    @property
+    def cache(self) -> TTLCache:
+        """Read-through cache for this table; rows are keyed by ("row", id)"""
+        return get_cache(self.table_name)
+
     def _handle_error(self, response: Any) -> None:
         """Handle common Supabase errors"""
         if hasattr(response, 'error') and response.error:
             raise DatabaseError(f"Supabase error: {response.error.message}")
 
-    async def find_all(self) -> List[Dict[str, Any]]:
-        """Get all records from the table"""
-        response = self.supabase.table(self.table_name).select("*").execute()
+    async def _execute(self, query: Any) -> Any:
+        """Run a query off the event loop and check the response"""
+        response = await run_query(query)
         self._handle_error(response)
-        return response.data
+        return response
+
+    async def find_all(self) -> List[Dict[str, Any]]:
+        """Get all records from the table, fetched page by page"""
+        return [row async for row in self.iter_all()]
+
+    async def find_page(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of records in keyset order, plus the cursor for the next page"""
+        return await self._find_page(self.supabase.table(self.table_name).select("*"), limit, cursor)
+
+    async def iter_pages(self, page_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream every record in the table, one page per iteration"""
+        cursor = None
+        while True:
+            rows, cursor = await self.find_page(page_size, cursor)
+            if rows:
+                yield rows
+            if cursor is None:
+                return
+
+    async def iter_all(self, page_size: int = 500) -> AsyncIterator[Dict[str, Any]]:
+        """Stream every record in the table one page at a time"""
+        async for rows in self.iter_pages(page_size):
+            for row in rows:
+                yield row
+
+    async def _find_page(self, query: Any, limit: int, cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Apply keyset pagination to a select query and run it"""
+        query = apply_keyset(query, self.order_columns, limit, cursor, desc=self.order_desc)
+        response = await self._execute(query)
+        return split_page(response.data, self.order_columns, limit)
 
     async def find_by_id(self, id: int) -> Dict[str, Any]:
-        """Get a record by ID"""
-        response = self.supabase.table(self.table_name).select("*").eq("id", id).execute()
-        self._handle_error(response)
+        """Get a record by ID, served from the cache when possible"""
+        return await self.cache.get_or_load(("row", id), lambda: self._fetch_by_id(id))
+
+    async def _fetch_by_id(self, id: int) -> Dict[str, Any]:
+        response = await self._execute(self.supabase.table(self.table_name).select("*").eq("id", id))
         
         if not response.data:
             raise RecordNotFoundError(f"{self.table_name} with ID {id} not found")
@@ -32,24 +76,27 @@ class BaseRepository(Generic[T]):
 
     async def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new record"""
-        response = self.supabase.table(self.table_name).insert(data).execute()
-        self._handle_error(response)
+        response = await self._execute(self.supabase.table(self.table_name).insert(data))
         return response.data[0]
 
     async def update(self, id: int, data: Dict[str, Any]) -> Dict[str, Any]:
         """Update a record"""
-        response = self.supabase.table(self.table_name).update(data).eq("id", id).execute()
-        self._handle_error(response)
+        response = await self._execute(self.supabase.table(self.table_name).update(data).eq("id", id))
         
         if not response.data:
             raise RecordNotFoundError(f"{self.table_name} with ID {id} not found")
         
+        self.invalidate(id)
         return response.data[0]
 
     async def delete(self, id: int) -> None:
         """Delete a record"""
-        response = self.supabase.table(self.table_name).delete().eq("id", id).execute()
-        self._handle_error(response)
+        response = await self._execute(self.supabase.table(self.table_name).delete().eq("id", id))
+        self.invalidate(id)
         
         if not response.data:
-            raise RecordNotFoundError(f"{self.table_name} with ID {id} not found") 
\ No newline at end of file
+            raise RecordNotFoundError(f"{self.table_name} with ID {id} not found")
+
+    def invalidate(self, id: int) -> None:
+        """Drop every cached shape of a record (override to add derived keys)"""
+        self.cache.invalidate(("row", id)) 
\ No newline at end of file
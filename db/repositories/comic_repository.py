@@ -1,51 +1,131 @@
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from supabase import Client
 from .base import BaseRepository
+from ..cache import get_cache
+from ..exceptions.database import DatabaseError, RecordNotFoundError
 from models.comic import Comic, ComicCreate, ComicUpdate
 
+# A comic row with its panels and parent story embedded through foreign keys
+COMIC_WITH_RELATIONS = (
+    "id, date, title, story_id, "
+    "panels(id, comic_id, sentence, image_url, panel_order), "
+    "story(id, title, story, created_at)"
+)
+
+def with_relations(query: Any) -> Any:
+    """Have PostgREST return panels (in order) and the story with each comic row
+
+    Works for reads as well as inserts and updates, whose returned
+    representation honours the same select parameter.
+    """
+    query.params = query.params.set("select", COMIC_WITH_RELATIONS).set("panels.order", "panel_order")
+    return query
+
+# Callbacks run with a comic's ID after its panels change outside ComicRepository
+_panel_change_listeners: List[Callable[[int], None]] = []
+
+def on_panels_changed(listener: Callable[[int], None]) -> None:
+    """Register a callback for panel changes, e.g. to drop derived copies of the comic"""
+    _panel_change_listeners.append(listener)
+
+def panels_changed(comic_id: int) -> None:
+    """Drop the cached comic with relations and notify the registered listeners"""
+    get_cache("comics").invalidate(("relations", comic_id), ("rendered", comic_id))
+    for listener in _panel_change_listeners:
+        listener(comic_id)
+
 class ComicRepository(BaseRepository[Comic]):
+    # Newest first; served by the comics_date_id_idx index
+    order_columns = ("date", "id")
+    order_desc = True
+
     def __init__(self, supabase: Client):
         super().__init__(supabase, "comics")
 
+    async def find_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of comics, newest first, optionally within a date range"""
+        query = self.supabase.table(self.table_name).select("*")
+        if date_from:
+            query = query.gte("date", date_from)
+        if date_to:
+            query = query.lte("date", date_to)
+        return await self._find_page(query, limit, cursor)
+
     async def find_with_panels(self, comic_id: int) -> Dict[str, Any]:
-        """Get a comic with its panels"""
-        # First get the comic
-        comic = await self.find_by_id(comic_id)
+        """Get a comic with its panels and story, from the cache or in a single request"""
+        return await self.cache.get_or_load(("relations", comic_id), lambda: self._fetch_with_panels(comic_id))
+
+    async def _fetch_with_panels(self, comic_id: int) -> Dict[str, Any]:
+        query = with_relations(self.supabase.table(self.table_name).select("*")).eq("id", comic_id)
+        response = await self._execute(query)
         
-        # Then get its panels
-        panels_response = self.supabase.table("panels").select("*").eq("comic_id", comic_id).order("panel_order").execute()
-        self._handle_error(panels_response)
+        if not response.data:
+            raise RecordNotFoundError(f"{self.table_name} with ID {comic_id} not found")
         
-        # Combine the results
-        comic["panels"] = panels_response.data
-        return comic
+        return response.data[0]
 
     async def find_by_date(self, date: str) -> List[Dict[str, Any]]:
         """Find comics by date"""
-        response = self.supabase.table(self.table_name).select("*").eq("date", date).execute()
-        self._handle_error(response)
+        response = await self._execute(self.supabase.table(self.table_name).select("*").eq("date", date))
+        return response.data
+
+    async def find_latest_by_date(self, date: str) -> Dict[str, Any]:
+        """Get the newest comic of a date with its panels and story"""
+        query = with_relations(self.supabase.table(self.table_name).select("*"))
+        response = await self._execute(query.eq("date", date).order("id", desc=True).limit(1))
+        
+        if not response.data:
+            raise RecordNotFoundError(f"{self.table_name} for {date} not found")
+        
+        return response.data[0]
+
+    async def create_with_panels(
+        self,
+        comic_data: Dict[str, Any],
+        panels_data: List[Dict[str, Any]],
+        story_data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Create a comic with its panels, and optionally a new story, in one transaction
+        
+        Runs the create_comic_with_panels database function, so nothing is
+        written unless everything is, and returns the assembled comic with its
+        panels and story.
+        """
+        response = await self._execute(self.supabase.rpc("create_comic_with_panels", {
+            "comic_data": comic_data,
+            "panels_data": panels_data,
+            "story_data": story_data
+        }))
+        
+        if not response.data:
+            raise DatabaseError("Failed to create comic")
+        
+        comic = response.data[0]
+        self.cache.set(("relations", comic["id"]), comic)
+        return comic
+
+    async def create_many_with_panels(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create several comics with their panels and stories in one transaction
+        
+        Each item holds the comic_data, panels_data and story_data arguments
+        of create_with_panels. Runs the create_comics_with_panels database
+        function and returns the assembled comics in input order.
+        """
+        response = await self._execute(self.supabase.rpc("create_comics_with_panels", {"items": items}))
+        
+        if len(response.data or []) != len(items):
+            raise DatabaseError("Failed to create comics")
+        
+        for comic in response.data:
+            self.cache.set(("relations", comic["id"]), comic)
         return response.data
 
-    async def create_with_panels(self, comic_data: Dict[str, Any], panels_data: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Create a comic with its panels in a transaction"""
-        # First create the comic
-        comic = await self.create(comic_data)
-        comic_id = comic["id"]
-        
-        try:
-            # Add comic_id to each panel
-            for panel in panels_data:
-                panel["comic_id"] = comic_id
-            
-            # Create the panels
-            panels_response = self.supabase.table("panels").insert(panels_data).execute()
-            self._handle_error(panels_response)
-            
-            # Combine the results
-            comic["panels"] = panels_response.data
-            return comic
-            
-        except Exception as e:
-            # If panels creation fails, delete the comic to maintain consistency
-            await self.delete(comic_id)
-            raise e 
\ No newline at end of file
+    def invalidate(self, id: int) -> None:
+        """Drop the cached row, the cached comic with relations and its rendered response"""
+        self.cache.invalidate(("row", id), ("relations", id), ("rendered", id))
@@ -1,26 +1,63 @@
 from typing import Dict, List, Any
 from supabase import Client
 from .base import BaseRepository
+from .comic_repository import panels_changed
+from ..exceptions.database import RecordNotFoundError
 from models.comic import Panel
 
 class PanelRepository(BaseRepository[Panel]):
+    # Comics per request when batch loading; keeps results under PostgREST's max-rows
+    BATCH_SIZE = 100
+
     def __init__(self, supabase: Client):
         super().__init__(supabase, "panels")
 
+    async def find_by_comic_ids(self, comic_ids: List[int], columns: str = "*") -> Dict[int, List[Dict[str, Any]]]:
+        """Get the panels of many comics at once, grouped by comic ID in panel order
+
+        `columns` must include comic_id.
+        """
+        grouped: Dict[int, List[Dict[str, Any]]] = {comic_id: [] for comic_id in comic_ids}
+        ids = list(grouped)
+        for start in range(0, len(ids), self.BATCH_SIZE):
+            query = (
+                self.supabase.table(self.table_name)
+                .select(columns)
+                .in_("comic_id", ids[start:start + self.BATCH_SIZE])
+                .order("comic_id.asc,panel_order.asc")
+            )
+            response = await self._execute(query)
+            for panel in response.data:
+                grouped[panel["comic_id"]].append(panel)
+        return grouped
+
     async def find_by_comic_id(self, comic_id: int) -> List[Dict[str, Any]]:
         """Get all panels for a specific comic"""
-        response = self.supabase.table(self.table_name).select("*").eq("comic_id", comic_id).order("panel_order").execute()
-        self._handle_error(response)
+        response = await self._execute(self.supabase.table(self.table_name).select("*").eq("comic_id", comic_id).order("panel_order"))
         return response.data
 
+    async def update(self, id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Update a panel; cached reads of its comic are dropped"""
+        panel = await super().update(id, data)
+        panels_changed(panel["comic_id"])
+        return panel
+
     async def update_panel_order(self, panel_id: int, new_order: int) -> Dict[str, Any]:
         """Update the order of a panel"""
-        response = self.supabase.table(self.table_name).update({"panel_order": new_order}).eq("id", panel_id).execute()
-        self._handle_error(response)
-        return response.data[0]
+        return await self.update(panel_id, {"panel_order": new_order})
+
+    async def delete(self, id: int) -> None:
+        """Delete a panel; cached reads of its comic are dropped"""
+        response = await self._execute(self.supabase.table(self.table_name).delete().eq("id", id))
+        self.invalidate(id)
+        
+        if not response.data:
+            raise RecordNotFoundError(f"{self.table_name} with ID {id} not found")
+        panels_changed(response.data[0]["comic_id"])
 
     async def bulk_create(self, panels: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Create multiple panels at once"""
-        response = self.supabase.table(self.table_name).insert(panels).execute()
-        self._handle_error(response)
+        response = await self._execute(self.supabase.table(self.table_name).insert(panels))
+        for comic_id in {panel["comic_id"] for panel in response.data if panel.get("comic_id") is not None}:
+            panels_changed(comic_id)
         return response.data 
\ No newline at end of file
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+from .metrics import SINGLE_FLIGHT_CALLS
+
+T = TypeVar('T')
+
+class SingleFlight:
+    """Runs one call per key at a time and shares its outcome with every
+    caller that asks for the same key while it is in flight
+
+    Nothing is kept once the call finishes; the next caller starts a new
+    one. The shared call is shielded, so a caller that goes away (e.g. a
+    disconnected client) does not cancel it for the others. Meant for a
+    single event loop, like the rest of the request path.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.shared = 0
+        self._in_flight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        # Bound once so each call only pays for an increment
+        self._call_counter = SINGLE_FLIGHT_CALLS.labels(name, "executed")
+        self._shared_counter = SINGLE_FLIGHT_CALLS.labels(name, "shared")
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """Await the call in flight for `key`, starting `call()` if there is none
+
+        Every caller gets the same result object, or the same exception.
+        """
+        loop = asyncio.get_running_loop()
+        task = self._in_flight.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(call())
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self._in_flight[key] = task
+            self.calls += 1
+            self._call_counter.inc()
+        else:
+            self.shared += 1
+            self._shared_counter.inc()
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved, even if every caller went away
+
+    def forget(self) -> None:
+        """Make later callers start new calls instead of joining ones in flight
+
+        Callers already waiting keep their shared result.
+        """
+        self._in_flight.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls executed and shared, and calls currently in flight"""
+        total = self.calls + self.shared
+        return {
+            "executed": self.calls,
+            "shared": self.shared,
+            "shared_ratio": self.shared / total if total else 0.0,
+            "in_flight": len(self._in_flight)
+        }
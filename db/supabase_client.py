@@ -1,9 +1,14 @@
 import os
+import threading
 from typing import Optional
 from functools import lru_cache
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
+from postgrest.utils import SyncClient
 from .exceptions.database import DatabaseConnectionError
+from .executor import DEFAULT_MAX_WORKERS, get_supabase_executor, run_query
+from .http_pool import pool_settings, pool_stats
 from .repositories.comic_repository import ComicRepository
 from .repositories.panel_repository import PanelRepository
 
@@ -12,28 +17,62 @@ load_dotenv()
 
 class SupabaseClient:
     _instance: Optional[Client] = None
+    _lock = threading.Lock()
     
     @classmethod
     def get_client(cls) -> Client:
         """Get or create the Supabase client instance"""
-        if cls._instance is None:
-            supabase_url = os.environ.get("SUPABASE_URL")
-            supabase_key = os.environ.get("SUPABASE_KEY")
+        if cls._instance is not None:
+            return cls._instance
+        
+        # Dependencies resolve in worker threads; build only one client and pool
+        with cls._lock:
+            if cls._instance is None:
+                supabase_url = os.environ.get("SUPABASE_URL")
+                supabase_key = os.environ.get("SUPABASE_KEY")
             
-            if not supabase_url or not supabase_key:
-                raise DatabaseConnectionError("Missing Supabase credentials. Please check your .env file.")
+                if not supabase_url or not supabase_key:
+                    raise DatabaseConnectionError("Missing Supabase credentials. Please check your .env file.")
             
-            try:
-                # Initialize client with URL and key only, without any additional options
-                cls._instance = create_client(
-                    supabase_url=supabase_url,
-                    supabase_key=supabase_key
-                )
-            except Exception as e:
-                raise DatabaseConnectionError(f"Failed to connect to Supabase: {str(e)}")
+                try:
+                    # Initialize client with URL and key only, without any additional options
+                    client = create_client(
+                        supabase_url=supabase_url,
+                        supabase_key=supabase_key
+                    )
+                    cls._configure_pool(client)
+                    cls._instance = client
+                except Exception as e:
+                    raise DatabaseConnectionError(f"Failed to connect to Supabase: {str(e)}")
         
         return cls._instance
 
+    @staticmethod
+    def _configure_pool(client: Client) -> None:
+        """Swap the default PostgREST session for one with explicit pool settings
+        
+        Every executor thread can hold one connection, so the pool defaults to
+        the executor size and keeps those connections alive between bursts.
+        """
+        default_session = client.postgrest.session
+        client.postgrest.session = SyncClient(
+            base_url=default_session.base_url,
+            headers=default_session.headers,
+            **pool_settings(
+                "SUPABASE",
+                max_connections=int(os.environ.get("SUPABASE_MAX_WORKERS", DEFAULT_MAX_WORKERS)),
+                timeout=DEFAULT_POSTGREST_CLIENT_TIMEOUT
+            )
+        )
+        default_session.close()
+
+    @classmethod
+    def close(cls) -> None:
+        """Close the client's connections; the next get_client creates a new one"""
+        if cls._instance is not None:
+            cls._instance.postgrest.session.close()
+            cls._instance = None
+
 @lru_cache()
 def get_supabase_client() -> Client:
     """Returns the Supabase client instance (cached)"""
@@ -47,4 +86,17 @@ def get_comic_repository() -> ComicRepository:
 @lru_cache()
 def get_panel_repository() -> PanelRepository:
     """Returns a PanelRepository instance (cached)"""
-    return PanelRepository(get_supabase_client())
\ No newline at end of file
+    return PanelRepository(get_supabase_client())
+
+def close_supabase_client() -> None:
+    """Close the cached Supabase client and its connection pool"""
+    SupabaseClient.close()
+    get_supabase_client.cache_clear()
+    get_comic_repository.cache_clear()
+    get_panel_repository.cache_clear()
+
+def supabase_pool_stats() -> dict:
+    """Connection pool usage of the Supabase client, if it has been created"""
+    if SupabaseClient._instance is None:
+        return {}
+    return pool_stats(SupabaseClient._instance.postgrest.session)
@@ -0,0 +1,31 @@
+import threading
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Set
+
+class RequestTrace:
+    """Per-request timing breakdown, filled in only while a request is traced
+
+    Stages accumulate [total seconds, calls]; threads holds the executor
+    threads currently running blocking calls for the request, so a sampling
+    profiler can include their stacks.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+        self.threads: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+# Set by the profiling middleware; None (the default) keeps tracing off
+current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("current_trace", default=None)
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Add time to the current request's breakdown, if it is being traced"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
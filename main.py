@@ -32,5 +32,11 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 if __name__ == "__main__":
+    # Development server; production runs through server.py
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("APP_PORT", 8000)),
+        reload=os.getenv("APP_DEBUG", "false").lower() == "true"
+    )
\ No newline at end of file
@@ -34,9 +34,28 @@ class ComicUpdate(BaseModel):
 class Comic(ComicBase):
     """Model for a comic with ID"""
     id: int
+    story_id: Optional[int] = None
     panels: List[Panel] = []
-    story: Story  # Required story relationship
+    story: Optional[Story] = None  # Comics generated before stories were linked have none
     
     model_config = {
         "from_attributes": True
-    }
\ No newline at end of file
+    }
+
+class ComicList(BaseModel):
+    """Cursor-paginated list of comics, newest first"""
+    items: List[Comic]
+    limit: int
+    next_cursor: Optional[str] = None
+
+class ComicBatchFailure(BaseModel):
+    """A comic of a batch that could not be generated"""
+    index: int
+    date: date
+    error: str
+
+class ComicBatchResult(BaseModel):
+    """Outcome of a batch generation: the comics created and those that failed"""
+    requested: int
+    created: List[Comic]
+    failed: List[ComicBatchFailure] = []
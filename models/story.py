@@ -15,7 +15,7 @@ class Story(StoryBase):
     """Model for a story with ID and timestamps"""
     id: int
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None  # not a column of the story table
     
     model_config = {
         "from_attributes": True
@@ -30,15 +30,21 @@ class StoryBrief(BaseModel):
     id: int
     title: str
     created_at: datetime
+    rank: Optional[float] = None  # search relevance, only set for searches
     
     model_config = {
         "from_attributes": True
     }
 
 class StoryList(BaseModel):
-    """Paginated list of stories"""
+    """Paginated list of stories
+    
+    total and total_pages are estimates and may be omitted; page is omitted
+    when the list was fetched with a cursor.
+    """
     items: List[StoryBrief]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     page_size: int
-    total_pages: int
\ No newline at end of file
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
\ No newline at end of file
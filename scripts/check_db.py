@@ -8,6 +8,8 @@ from commands.db_check import (
     get_comics_by_date,
     insert_test_comic
 )
+from commands.generate import generate_comics
+from commands.archive import export_archive_file, import_archive_file
 from utils.common import setup_environment
 
 logger = logging.getLogger(__name__)
@@ -19,7 +21,9 @@ def setup_parser() -> argparse.ArgumentParser:
     subparsers = parser.add_subparsers(dest="command", help="Command to execute")
     
     # List comics command
-    subparsers.add_parser("list", help="List all comics")
+    list_parser = subparsers.add_parser("list", help="List all comics")
+    list_parser.add_argument("--page-size", type=int, default=100, help="Comics fetched per request")
+    list_parser.add_argument("--stream", action="store_true", help="Write comics to stdout as JSON lines as they load")
     
     # Get comic by ID command
     get_parser = subparsers.add_parser("get", help="Get a specific comic by ID")
@@ -32,6 +36,23 @@ def setup_parser() -> argparse.ArgumentParser:
     # Insert test comic command
     subparsers.add_parser("test", help="Insert a test comic")
     
+    # Generate comics command
+    generate_parser = subparsers.add_parser("generate", help="Generate comics for consecutive dates")
+    generate_parser.add_argument("--count", type=int, required=True, help="Number of comics to generate")
+    generate_parser.add_argument("--start", type=str, help="Date of the first comic in YYYY-MM-DD format (default: today)")
+    generate_parser.add_argument("--concurrency", type=int, help="Comics generated at once (default: COMIC_BATCH_CONCURRENCY)")
+    
+    # Export archive command
+    export_parser = subparsers.add_parser("export", help="Export stories, comics and panels as NDJSON")
+    export_parser.add_argument("--output", type=str, help="File to write (default: stdout)")
+    export_parser.add_argument("--page-size", type=int, default=500, help="Rows fetched per request")
+    
+    # Import archive command
+    import_parser = subparsers.add_parser("import", help="Import an NDJSON archive written by export")
+    import_parser.add_argument("file", type=str, help="NDJSON file to import")
+    import_parser.add_argument("--batch-size", type=int, default=1000, help="Rows written per request")
+    import_parser.add_argument("--checkpoint", type=str, help="Progress file used to resume (default: FILE.checkpoint)")
+    
     return parser
 
 async def main() -> None:
@@ -50,13 +71,19 @@ async def main() -> None:
     # Execute command
     try:
         if args.command == "list":
-            await list_comics()
+            await list_comics(args.page_size, args.stream)
         elif args.command == "get":
             await get_comic_by_id(args.id)
         elif args.command == "date":
             await get_comics_by_date(args.date)
         elif args.command == "test":
             await insert_test_comic()
+        elif args.command == "generate":
+            await generate_comics(args.count, args.start, args.concurrency)
+        elif args.command == "export":
+            await export_archive_file(args.output, args.page_size)
+        elif args.command == "import":
+            await import_archive_file(args.file, args.batch_size, args.checkpoint)
     except Exception as e:
         logger.error(f"Error executing command: {e}")
 
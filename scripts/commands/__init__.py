@@ -6,6 +6,8 @@ from .db_check import (
     get_comics_by_date,
     insert_test_comic
 )
+from .generate import generate_comics
+from .archive import export_archive_file, import_archive_file
 from .db_setup import setup_database
 
 __all__ = [
@@ -13,5 +15,8 @@ __all__ = [
     'get_comic_by_id',
     'get_comics_by_date',
     'insert_test_comic',
+    'generate_comics',
+    'export_archive_file',
+    'import_archive_file',
     'setup_database'
 ] 
\ No newline at end of file
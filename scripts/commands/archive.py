@@ -0,0 +1,39 @@
+import sys
+import logging
+from typing import Dict, Optional
+from db import get_supabase_client
+from db.archive import ArchiveImporter, export_archive
+
+logger = logging.getLogger(__name__)
+
+async def export_archive_file(output: Optional[str] = None, page_size: int = 500) -> None:
+    """Write every story, comic and panel as NDJSON to `output` (default: stdout)"""
+    f = open(output, "wb") if output else sys.stdout.buffer
+    lines = 0
+    try:
+        async for chunk in export_archive(get_supabase_client(), page_size):
+            f.write(chunk)
+            lines += chunk.count(b"\n")
+    finally:
+        if output:
+            f.close()
+        else:
+            f.flush()
+    logger.info(f"Exported {lines} rows to {output or 'stdout'}.")
+
+async def import_archive_file(path: str, batch_size: int = 1000, checkpoint: Optional[str] = None) -> Dict:
+    """Import an NDJSON archive written by `export`
+    
+    Progress is saved to `checkpoint` (default: <path>.checkpoint) after every
+    batch; running the same import again resumes after the last saved batch.
+    """
+    importer = ArchiveImporter(get_supabase_client(), batch_size, checkpoint or f"{path}.checkpoint")
+    with open(path, "rb") as f:
+        result = await importer.run(f)
+    
+    if result["skipped_lines"]:
+        logger.info(f"Resumed after line {result['skipped_lines']}.")
+    for table, count in result["rows"].items():
+        logger.info(f"Imported {count} {table} rows")
+    logger.info(f"Imported {sum(result['rows'].values())} rows in {result['seconds']}s ({result['rows_per_second']} rows/s).")
+    return result
@@ -1,3 +1,5 @@
+import sys
+import json
 import logging
 from typing import Optional, List
 from datetime import date
@@ -6,23 +8,41 @@ from ..utils.common import format_comic_output, parse_date
 
 logger = logging.getLogger(__name__)
 
-async def list_comics() -> None:
-    """List all comics in the database"""
+async def list_comics(page_size: int = 100, stream: bool = False) -> None:
+    """List all comics in the database, newest first, one page at a time
+    
+    With stream=True each comic is written to stdout as a JSON line as soon
+    as its page has loaded, for piping large archives into other tools.
+    """
     comic_repo = get_comic_repository()
-    comics = await comic_repo.find_all()
+    panel_repo = get_panel_repository()
+    count = 0
+    
+    async for comics in comic_repo.iter_pages(page_size):
+        # Load the panels for the whole page in one request
+        panels_by_comic = await panel_repo.find_by_comic_ids(
+            [comic['id'] for comic in comics],
+            columns="id, comic_id, panel_order"
+        )
+        
+        for comic in comics:
+            panels = panels_by_comic[comic['id']]
+            if stream:
+                sys.stdout.write(json.dumps({**comic, "panel_count": len(panels)}, default=str) + "\n")
+            else:
+                logger.info("\n" + format_comic_output(comic, include_panels=False))
+                logger.info(f"Panels: {len(panels)}")
+                logger.info("-" * 40)
+        
+        if stream:
+            sys.stdout.flush()
+        count += len(comics)
     
-    if not comics:
+    if not count:
         logger.info("No comics found in the database.")
         return
     
-    logger.info(f"Found {len(comics)} comics:")
-    for comic in comics:
-        # Get panels for this comic
-        panels = await get_panel_repository().find_by_comic_id(comic['id'])
-        comic['panels'] = panels
-        logger.info("\n" + format_comic_output(comic, include_panels=False))
-        logger.info(f"Panels: {len(panels)}")
-        logger.info("-" * 40)
+    logger.info(f"Found {count} comics.")
 
 async def get_comic_by_id(comic_id: int) -> Optional[dict]:
     """Get a specific comic by ID"""
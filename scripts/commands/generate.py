@@ -0,0 +1,33 @@
+import logging
+from typing import Dict, Optional
+from db import get_supabase_client
+from api.services.comic_service import ComicService
+from ..utils.common import parse_date
+
+logger = logging.getLogger(__name__)
+
+async def generate_comics(count: int, start: Optional[str] = None, concurrency: Optional[int] = None) -> Dict:
+    """Generate comics for `count` consecutive dates, several at a time
+    
+    Progress is logged as comics are written; comics that fail are listed at
+    the end and do not stop the rest of the batch.
+    """
+    start_date = parse_date(start)
+    logger.info(f"Generating {count} comics from {start_date.isoformat()}")
+    
+    def report(progress: Dict[str, int]) -> None:
+        logger.info(
+            f"Progress: {progress['generated']} generated, {progress['created']} saved, "
+            f"{progress['failed']} failed of {progress['total']}"
+        )
+    
+    result = await ComicService().generate_batch(
+        count, start_date, get_supabase_client(), concurrency=concurrency, on_progress=report
+    )
+    
+    for comic in result["created"]:
+        logger.info(f"Created comic {comic['id']} for {comic['date']}: {comic['title']}")
+    for failure in result["failed"]:
+        logger.error(f"Failed comic for {failure['date'].isoformat()}: {failure['error']}")
+    logger.info(f"Generated {len(result['created'])} of {count} comics.")
+    return result
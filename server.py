@@ -0,0 +1,117 @@
+"""Production server for the API
+
+Runs the app under gunicorn with uvicorn workers, one by default:
+
+    python server.py --workers 2
+
+Background jobs, read caches and snapshot memory are still per process,
+so only run several workers when clients do not poll GET /jobs/{id}
+through other connections.
+
+The app is imported once in the master process (preload), so import errors
+stop the deploy before any worker starts. Each worker then builds its own
+clients and background tasks in the app's lifespan hook. On SIGTERM the
+workers stop accepting connections and get SERVER_GRACEFUL_TIMEOUT seconds
+to finish in-flight requests, including running generations.
+"""
+import os
+import shutil
+import argparse
+import tempfile
+import importlib.util
+from typing import Any, Dict
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+class ProductionWorker(UvicornWorker):
+    """Uvicorn worker on uvloop and httptools, falling back to the pure-Python stack"""
+    CONFIG_KWARGS = {
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        # Fail the worker when startup fails instead of serving without clients
+        "lifespan": "on",
+    }
+
+class Server(BaseApplication):
+    """Gunicorn application configured from a plain options dict"""
+
+    def __init__(self, app_uri: str, options: Dict[str, Any]):
+        self.app_uri = app_uri
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self) -> Any:
+        from gunicorn.util import import_app
+        return import_app(self.app_uri)
+
+def prepare_metrics_dir() -> None:
+    """Give the workers a shared, empty directory for Prometheus metrics
+    
+    Must run before the app (and prometheus_client) is imported, so every
+    worker writes its samples where GET /metrics can aggregate them.
+    """
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+    else:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="daily-comics-metrics-")
+
+def child_exit(server: Any, worker: Any) -> None:
+    """Drop the live gauges of a worker that exited"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+def default_workers() -> int:
+    """WEB_CONCURRENCY, as set by the deployment, else a single worker
+
+    Jobs are only found by the worker that accepted them, so more workers
+    are opt-in.
+    """
+    return int(os.getenv("WEB_CONCURRENCY", 1))
+
+def build_options(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": "server.ProductionWorker",
+        "preload_app": True,
+        "keepalive": args.keepalive,
+        "backlog": args.backlog,
+        "graceful_timeout": args.graceful_timeout,
+        # Heartbeat timeout; generation is awaited, so workers keep answering it
+        "timeout": args.timeout,
+        "accesslog": "-" if args.access_log else None,
+        "errorlog": "-",
+        "child_exit": child_exit,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the Daily Comics API in production")
+    parser.add_argument("--app", default="api.main:app", help="Application to serve")
+    parser.add_argument("--host", default=os.getenv("APP_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("APP_PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=default_workers(), help="Worker processes (WEB_CONCURRENCY)")
+    parser.add_argument("--keepalive", type=int, default=int(os.getenv("SERVER_KEEPALIVE", 75)),
+                        help="Seconds to hold idle keep-alive connections; keep above the proxy's idle timeout")
+    parser.add_argument("--backlog", type=int, default=int(os.getenv("SERVER_BACKLOG", 2048)),
+                        help="Pending connections queued by the kernel")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("SERVER_GRACEFUL_TIMEOUT", 60)),
+                        help="Seconds workers get to finish requests on shutdown")
+    parser.add_argument("--timeout", type=int, default=int(os.getenv("SERVER_TIMEOUT", 120)),
+                        help="Seconds before an unresponsive worker is restarted")
+    parser.add_argument("--access-log", action="store_true", help="Log every request to stdout")
+    args = parser.parse_args()
+
+    prepare_metrics_dir()
+    Server(args.app, build_options(args)).run()
+
+if __name__ == "__main__":
+    main()
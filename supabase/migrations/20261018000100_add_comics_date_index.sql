@@ -0,0 +1,3 @@
+-- Keyset pagination for comic listings orders by (date desc, id desc).
+-- Lookups by id keep using comics_pkey.
+CREATE INDEX IF NOT EXISTS comics_date_id_idx ON public.comics USING btree (date DESC, id DESC);
@@ -0,0 +1,3 @@
+-- Story listings are ordered by (created_at desc, id desc), both for page
+-- numbers and for keyset cursors.
+CREATE INDEX IF NOT EXISTS story_created_at_id_idx ON public.story USING btree (created_at DESC, id DESC);
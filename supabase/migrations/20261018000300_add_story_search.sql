@@ -0,0 +1,52 @@
+-- Full-text search over story titles and bodies.
+-- Each field gets its own generated tsvector and GIN index so searches can
+-- be restricted to one field and still be served by an index.
+ALTER TABLE "public"."story"
+    ADD COLUMN IF NOT EXISTS "title_tsv" tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce("title", ''))) STORED;
+
+ALTER TABLE "public"."story"
+    ADD COLUMN IF NOT EXISTS "story_tsv" tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce("story", ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS story_title_tsv_idx ON public.story USING gin (title_tsv);
+
+CREATE INDEX IF NOT EXISTS story_story_tsv_idx ON public.story USING gin (story_tsv);
+
+-- Ranked search used by GET /stories/?search=...
+-- search_fields is one of 'all', 'title' or 'story'. Title matches weigh
+-- more than body matches; ties fall back to newest first.
+CREATE OR REPLACE FUNCTION public.search_stories(
+    search_query text,
+    search_fields text DEFAULT 'all',
+    result_limit integer DEFAULT 10,
+    result_offset integer DEFAULT 0
+)
+RETURNS TABLE (id bigint, title text, created_at timestamptz, rank real)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('english', search_query) AS query
+    )
+    SELECT
+        s.id,
+        s.title,
+        s.created_at,
+        ts_rank_cd(
+            CASE search_fields
+                WHEN 'title' THEN setweight(s.title_tsv, 'A')
+                WHEN 'story' THEN s.story_tsv
+                ELSE setweight(s.title_tsv, 'A') || s.story_tsv
+            END,
+            q.query
+        ) AS rank
+    FROM public.story s, q
+    WHERE (search_fields IN ('all', 'title') AND s.title_tsv @@ q.query)
+       OR (search_fields IN ('all', 'story') AND s.story_tsv @@ q.query)
+    ORDER BY rank DESC, s.created_at DESC, s.id DESC
+    LIMIT least(result_limit, 101)
+    OFFSET result_offset;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.search_stories(text, text, integer, integer) TO anon, authenticated, service_role;
@@ -0,0 +1,66 @@
+-- Create a comic, its panels and (optionally) its story in one transaction.
+--
+-- comic_data:  {"date": "YYYY-MM-DD", "title": "...", "story_id": 1}
+-- panels_data: [{"sentence": "...", "image_url": "...", "panel_order": 1}, ...]
+-- story_data:  {"title": "...", "story": "..."} to insert a new story and
+--              link it; when null, comic_data.story_id links an existing one.
+--
+-- Returns the assembled comic (panels in order, story embedded) as a single
+-- jsonb row, shaped like the comic read endpoints.
+CREATE OR REPLACE FUNCTION public.create_comic_with_panels(
+    comic_data jsonb,
+    panels_data jsonb,
+    story_data jsonb DEFAULT NULL
+)
+RETURNS SETOF jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    linked_story public.story;
+    new_comic public.comics;
+BEGIN
+    IF story_data IS NOT NULL THEN
+        INSERT INTO public.story (title, story)
+        VALUES (story_data->>'title', story_data->>'story')
+        RETURNING * INTO linked_story;
+    ELSIF comic_data->>'story_id' IS NOT NULL THEN
+        SELECT * INTO linked_story FROM public.story s WHERE s.id = (comic_data->>'story_id')::bigint;
+    END IF;
+
+    INSERT INTO public.comics (date, title, story_id)
+    VALUES ((comic_data->>'date')::date, comic_data->>'title', linked_story.id)
+    RETURNING * INTO new_comic;
+
+    INSERT INTO public.panels (comic_id, sentence, image_url, panel_order)
+    SELECT new_comic.id, p->>'sentence', coalesce(p->>'image_url', ''), (p->>'panel_order')::integer
+    FROM jsonb_array_elements(coalesce(panels_data, '[]'::jsonb)) AS p;
+
+    RETURN QUERY
+    SELECT jsonb_build_object(
+        'id', new_comic.id,
+        'date', new_comic.date,
+        'title', new_comic.title,
+        'story_id', new_comic.story_id,
+        'panels', coalesce(
+            (SELECT jsonb_agg(jsonb_build_object(
+                        'id', pa.id,
+                        'comic_id', pa.comic_id,
+                        'sentence', pa.sentence,
+                        'image_url', pa.image_url,
+                        'panel_order', pa.panel_order
+                    ) ORDER BY pa.panel_order)
+             FROM public.panels pa
+             WHERE pa.comic_id = new_comic.id),
+            '[]'::jsonb
+        ),
+        'story', CASE WHEN linked_story.id IS NULL THEN NULL ELSE jsonb_build_object(
+            'id', linked_story.id,
+            'title', linked_story.title,
+            'story', linked_story.story,
+            'created_at', linked_story.created_at
+        ) END
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.create_comic_with_panels(jsonb, jsonb, jsonb) TO anon, authenticated, service_role;
@@ -0,0 +1,45 @@
+-- Pre-generated stories waiting to be published by POST /stories/generate.
+-- The API keeps a few rows here so a request only has to move one into
+-- public.story instead of waiting for an assistant run.
+CREATE TABLE IF NOT EXISTS "public"."story_pool" (
+    "id" bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    "created_at" timestamp with time zone NOT NULL DEFAULT now(),
+    "title" text NOT NULL,
+    "story" text NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS story_pool_created_at_idx ON public.story_pool USING btree (created_at, id);
+
+ALTER TABLE "public"."story_pool" DISABLE ROW LEVEL SECURITY;
+
+-- Move the oldest pooled story into public.story and return it, shaped like
+-- a story detail read. SKIP LOCKED lets concurrent callers claim different
+-- rows; an empty pool returns no rows.
+CREATE OR REPLACE FUNCTION public.claim_pooled_story()
+RETURNS TABLE (id bigint, title text, story text, created_at timestamptz)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    pooled public.story_pool;
+BEGIN
+    DELETE FROM public.story_pool p
+    WHERE p.id = (
+        SELECT sp.id FROM public.story_pool sp
+        ORDER BY sp.created_at, sp.id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING * INTO pooled;
+
+    IF pooled.id IS NULL THEN
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    INSERT INTO public.story AS s (title, story)
+    VALUES (pooled.title, pooled.story)
+    RETURNING s.id, s.title, s.story, s.created_at;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.claim_pooled_story() TO anon, authenticated, service_role;
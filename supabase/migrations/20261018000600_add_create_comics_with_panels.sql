@@ -0,0 +1,20 @@
+-- Batched form of create_comic_with_panels for bulk generation.
+--
+-- items: [{"comic_data": {...}, "panels_data": [...], "story_data": {...}}, ...]
+-- with the same shapes create_comic_with_panels takes. All items are written
+-- in one transaction and returned in input order, one jsonb row each.
+CREATE OR REPLACE FUNCTION public.create_comics_with_panels(items jsonb)
+RETURNS SETOF jsonb
+LANGUAGE sql
+AS $$
+    SELECT created
+    FROM jsonb_array_elements(items) WITH ORDINALITY AS item(data, position)
+    CROSS JOIN LATERAL public.create_comic_with_panels(
+        item.data->'comic_data',
+        item.data->'panels_data',
+        item.data->'story_data'
+    ) AS created
+    ORDER BY item.position;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.create_comics_with_panels(jsonb) TO anon, authenticated, service_role;
@@ -0,0 +1,14 @@
+-- Archive imports write rows with their original ids, which does not move
+-- the id sequences. Called once an import is done so rows created later
+-- get ids past everything imported. is_called = false makes the next
+-- nextval() return exactly max(id) + 1.
+CREATE OR REPLACE FUNCTION public.sync_archive_sequences()
+RETURNS void
+LANGUAGE sql
+AS $$
+    SELECT setval(pg_get_serial_sequence('public.story', 'id'), COALESCE((SELECT max(id) FROM public.story), 0) + 1, false);
+    SELECT setval(pg_get_serial_sequence('public.comics', 'id'), COALESCE((SELECT max(id) FROM public.comics), 0) + 1, false);
+    SELECT setval(pg_get_serial_sequence('public.panels', 'id'), COALESCE((SELECT max(id) FROM public.panels), 0) + 1, false);
+$$;
+
+GRANT EXECUTE ON FUNCTION public.sync_archive_sequences() TO anon, authenticated, service_role;
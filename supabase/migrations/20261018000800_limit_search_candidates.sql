@@ -0,0 +1,49 @@
+-- Rank at most the 1100 newest matches of a search.
+-- ts_rank_cd has to read the tsvector of every row it ranks. Before this,
+-- a common term ranked every match ahead of the LIMIT, which took hundreds
+-- of milliseconds at 100k stories. Candidates are now the newest matches:
+-- - for a common term, Postgres walks story_created_at_id_idx and stops
+--   once it has enough of them;
+-- - for a rare term, it uses the GIN indexes as before.
+-- Only those candidates are ranked, so older matches are not returned,
+-- however well they score. The cap is fixed, so every page of a search
+-- ranks the same candidates. 1100 is the deepest page reachable by number
+-- (StoryService.MAX_PAGE_OFFSET = 1000) plus the largest page (100).
+CREATE OR REPLACE FUNCTION public.search_stories(
+    search_query text,
+    search_fields text DEFAULT 'all',
+    result_limit integer DEFAULT 10,
+    result_offset integer DEFAULT 0
+)
+RETURNS TABLE (id bigint, title text, created_at timestamptz, rank real)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH candidates AS (
+        SELECT s.id
+        FROM public.story s
+        WHERE (search_fields IN ('all', 'title') AND s.title_tsv @@ websearch_to_tsquery('english', search_query))
+           OR (search_fields IN ('all', 'story') AND s.story_tsv @@ websearch_to_tsquery('english', search_query))
+        ORDER BY s.created_at DESC, s.id DESC
+        LIMIT 1100
+    )
+    SELECT
+        s.id,
+        s.title,
+        s.created_at,
+        ts_rank_cd(
+            CASE search_fields
+                WHEN 'title' THEN setweight(s.title_tsv, 'A')
+                WHEN 'story' THEN s.story_tsv
+                ELSE setweight(s.title_tsv, 'A') || s.story_tsv
+            END,
+            websearch_to_tsquery('english', search_query)
+        ) AS rank
+    FROM candidates c
+    JOIN public.story s ON s.id = c.id
+    ORDER BY rank DESC, s.created_at DESC, s.id DESC
+    LIMIT least(result_limit, 101)
+    OFFSET result_offset;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.search_stories(text, text, integer, integer) TO anon, authenticated, service_role;
@@ -0,0 +1,81 @@
+-- Idempotency-Key outcomes of the generate endpoints, shared by every API
+-- worker. A row is claimed by the request that runs the work and holds its
+-- rendered response once that succeeded; a failed run deletes its row.
+-- expires_at is the lease of a running request, then the replay window of
+-- the stored response. Expired rows can be claimed again and are purged.
+CREATE TABLE IF NOT EXISTS "public"."idempotency_keys" (
+    "method" text NOT NULL,
+    "path" text NOT NULL,
+    "idempotency_key" text NOT NULL,
+    "fingerprint" text NOT NULL,
+    "claim_id" uuid NOT NULL,
+    "expires_at" timestamp with time zone NOT NULL,
+    "status_code" integer,
+    "body" text,
+    "headers" jsonb,
+    "created_at" timestamp with time zone NOT NULL DEFAULT now(),
+    PRIMARY KEY ("method", "path", "idempotency_key")
+);
+
+CREATE INDEX IF NOT EXISTS idempotency_keys_expires_at_idx ON public.idempotency_keys USING btree (expires_at);
+
+ALTER TABLE "public"."idempotency_keys" DISABLE ROW LEVEL SECURITY;
+
+-- Claim a key for a request, or return the request that holds it.
+-- claimed is true when the caller inserted the key, or took over one whose
+-- lease or replay window is over, and must now run the work. Otherwise the
+-- stored fingerprint and, once finished, the stored response are returned.
+-- Up to 100 expired keys are purged on each call.
+CREATE OR REPLACE FUNCTION public.claim_idempotency_key(
+    request_method text,
+    request_path text,
+    request_key text,
+    request_fingerprint text,
+    request_claim_id uuid,
+    lease_seconds integer
+)
+RETURNS TABLE (
+    claimed boolean,
+    stored_fingerprint text,
+    response_status integer,
+    response_body text,
+    response_headers jsonb
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM public.idempotency_keys k
+    WHERE k.ctid IN (
+        SELECT e.ctid FROM public.idempotency_keys e
+        WHERE e.expires_at < now()
+        LIMIT 100
+        FOR UPDATE SKIP LOCKED
+    );
+
+    RETURN QUERY
+    INSERT INTO public.idempotency_keys AS k (method, path, idempotency_key, fingerprint, claim_id, expires_at)
+    VALUES (request_method, request_path, request_key, request_fingerprint, request_claim_id,
+            now() + make_interval(secs => lease_seconds))
+    ON CONFLICT (method, path, idempotency_key) DO UPDATE
+        SET fingerprint = EXCLUDED.fingerprint,
+            claim_id = EXCLUDED.claim_id,
+            expires_at = EXCLUDED.expires_at,
+            status_code = NULL,
+            body = NULL,
+            headers = NULL,
+            created_at = now()
+        WHERE k.expires_at < now()
+    RETURNING true, k.fingerprint, k.status_code, k.body, k.headers;
+
+    IF FOUND THEN
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    SELECT false, k.fingerprint, k.status_code, k.body, k.headers
+    FROM public.idempotency_keys k
+    WHERE k.method = request_method AND k.path = request_path AND k.idempotency_key = request_key;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.claim_idempotency_key(text, text, text, text, uuid, integer) TO anon, authenticated, service_role;
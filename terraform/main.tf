@@ -51,7 +51,15 @@ resource "aws_lightsail_instance" "daily_comics" {
               User=ubuntu
               WorkingDirectory=/opt/daily-comics
               Environment="PATH=/opt/daily-comics/venv/bin"
-              ExecStart=/opt/daily-comics/venv/bin/uvicorn api.main:app --host 0.0.0.0 --port 8000
+              # One worker: background jobs are kept in the worker's memory,
+              # so GET /jobs/{id} must reach the worker that accepted the job
+              Environment="WEB_CONCURRENCY=1"
+              ExecStart=/opt/daily-comics/venv/bin/python server.py --host 0.0.0.0 --port 8000
+              # SIGTERM drains in-flight requests for up to SERVER_GRACEFUL_TIMEOUT (60s)
+              KillSignal=SIGTERM
+              TimeoutStopSec=75
+              Restart=on-failure
+              LimitNOFILE=65536
 
               [Install]
               WantedBy=multi-user.target